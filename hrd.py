@@ -1,606 +1,4310 @@
-from copy import deepcopy
-from heapq import heappush, heappop
-import time
-import argparse
-import sys
-
-#====================================================================================
-
-char_goal = '1'
-char_single = '2'
-
-class Piece:
-    """
-    This represents a piece on the Hua Rong Dao puzzle.
-    """
-
-    def __init__(self, is_goal, is_single, coord_x, coord_y, orientation):
-        """
-        :param is_goal: True if the piece is the goal piece and False otherwise.
-        :type is_goal: bool
-        :param is_single: True if this piece is a 1x1 piece and False otherwise.
-        :type is_single: bool
-        :param coord_x: The x coordinate of the top left corner of the piece.
-        :type coord_x: int
-        :param coord_y: The y coordinate of the top left corner of the piece.
-        :type coord_y: int
-        :param orientation: The orientation of the piece (one of 'h' or 'v') 
-            if the piece is a 1x2 piece. Otherwise, this is None
-        :type orientation: str
-        """
-
-        self.is_goal = is_goal
-        self.is_single = is_single
-        self.coord_x = coord_x  # for top left corner
-        self.coord_y = coord_y  # for top left corner
-        self.orientation = orientation
-
-    def __repr__(self): 
-        '''Prints out the attributes of a piece for debugging purposes.'''
-        return '{} {} {} {} {}'.format(self.is_goal, self.is_single, \
-            self.coord_x, self.coord_y, self.orientation)
-
-    def move(self, direction):
-        '''Moves a piece and updates its attributes. The direction can be 
-        left ('l'), right ('r'), up ('u'), down ('d'). The function will return
-        which direction the piece has moved or "Error" if it did not work.''' #TODO
-        if direction == 'l':
-            self.coord_x = self.coord_x-1
-        elif direction == 'r':
-            self.coord_x = self.coord_x+1
-        elif direction == 'u':
-            self.coord_y = self.coord_y-1
-        elif direction == 'd':
-            self.coord_y = self.coord_y+1
-        return 
-    
-class Board:
-    """
-    Board class for setting up the playing board.
-    """
-
-    def __init__(self, pieces):
-        """
-        :param pieces: The list of Pieces
-        :type pieces: List[Piece]
-        """
-
-        self.width = 4
-        self.height = 5
-        self.pieces = pieces
-
-        # self.grid is a 2-d (size * size) array automatically generated
-        # using the information on the pieces when a board is being created.
-        # A grid contains the symbol for representing the pieces on the board.
-        self.grid = []
-        self.__construct_grid()
-
-    def __construct_grid(self):
-        """
-        Called in __init__ to set up a 2-d grid based on the piece location information.
-        """
-
-        for i in range(self.height):
-            line = []
-            for j in range(self.width):
-                line.append('.')
-            self.grid.append(line)
-
-        for piece in self.pieces: # converting the board into given form
-            if piece.is_goal:
-                self.grid[piece.coord_y][piece.coord_x] = char_goal
-                self.grid[piece.coord_y][piece.coord_x + 1] = char_goal
-                self.grid[piece.coord_y + 1][piece.coord_x] = char_goal
-                self.grid[piece.coord_y + 1][piece.coord_x + 1] = char_goal
-            elif piece.is_single:
-                self.grid[piece.coord_y][piece.coord_x] = char_single
-            else:
-                if piece.orientation == 'h':  # horizontal 1x2 piece
-                    self.grid[piece.coord_y][piece.coord_x] = '<'
-                    self.grid[piece.coord_y][piece.coord_x + 1] = '>'
-                elif piece.orientation == 'v':  # vertical 2x1 piece
-                    #print(self.grid)
-                    #print(piece.coord_y, piece.coord_x)
-                    self.grid[piece.coord_y][piece.coord_x] = '^'
-                    self.grid[piece.coord_y + 1][piece.coord_x] = 'v'
-                    #sprint('success')
-        
-        # Create string of grid content to be used in explored set comparison
-        self.grid_str = ''
-        for row in self.grid:
-            self.grid_str += ''.join(row) # format: '11<>11^2^^v2vv22<>..'
-    
-    def convert_line_to_grid(self, line):
-        '''Converts a line of characters into a 2-d grid.'''
-        grid = []
-        for i in range(self.height):
-            grid.append(line[i*self.width:(i+1)*self.width])
-        return grid
-
-    def display(self):
-        """
-        Print out the current board. If f is not None, print to the file f.
-        """
-
-        for i, line in enumerate(self.grid):
-            for ch in line:
-                print(ch, end='')
-            print()
-        # else:
-        #     for i, line in enumerate(self.grid):
-        #         print(self.convert_line_to_grid(line), file=f)
-                # for ch in line:
-                #     print(ch, end='', file=f)
-                    # f.write(ch)
-
-    
-    def find_spaces(self): 
-        '''Return the coordinates of the  empty spaces on the board.''' #TODO
-        spaces = [] # to store result
-        count = 0 # to keep track of how many spaces found (stop at 2)
-        # Iterate through each grid space on the board to find empty tiles:
-        while count < 2:
-            for i in range(self.height):
-                for j in range(self.width):
-                    if self.grid[i][j] == '.':
-                        spaces.append(i)
-                        spaces.append(j)
-                        count += 1
-        
-        return spaces # example format: [4,1,4,2] where [4][1] is a space and 
-                      # [4][2] is the location of another space 
-
-class State:
-    """
-    State class wrapping a Board with some extra current state information.
-    Note that State and Board are different. Board has the locations of the pieces. 
-    State has a Board and some extra information that is relevant to the search: 
-    heuristic function, f value, current depth and parent.
-    """
-
-    def __init__(self, board, f, depth, parent=None):
-        """
-        :param board: The board of the state.
-        :type board: Board
-        :param f: The f value of current state.
-        :type f: int
-        :param depth: The depth of current state in the search tree.
-        :type depth: int
-        :param parent: The parent of current state.
-        :type parent: Optional[State]
-        """
-        self.board = board
-        self.f = f
-        self.depth = depth # number of states from intial to goal state (cost: g)
-        self.parent = parent
-        self.id = hash(board)  # The id for breaking ties.
-
-        # Each state keeps track of heuristic and f value - get this from the 
-        # helper function heuristic(board) to give h value. f = g + h
-
-def read_from_file(filename):
-    """
-    Load initial board from a given file. Read in a puzzle
-
-    :param filename: The name of the given file.
-    :type filename: str
-    :return: A loaded board
-    :rtype: Board
-    """
-
-    puzzle_file = open(filename, "r")
-
-    line_index = 0
-    pieces = []
-    g_found = False
-
-    for line in puzzle_file:
-
-        for x, ch in enumerate(line):
-
-            if ch == '^': # found vertical piece
-                pieces.append(Piece(False, False, x, line_index, 'v'))
-            elif ch == '<': # found horizontal piece
-                pieces.append(Piece(False, False, x, line_index, 'h'))
-            elif ch == char_single:
-                pieces.append(Piece(False, True, x, line_index, None))
-            elif ch == char_goal:
-                if g_found == False:
-                    pieces.append(Piece(True, False, x, line_index, None))
-                    g_found = True
-        line_index += 1
-
-    puzzle_file.close()
-
-    board = Board(pieces)
-    
-    return board
-
-##############################################################################
-################  HELPER FUNCTIONS: ##########################################
-##############################################################################
-
-def is_goal(board):
-    '''Goal Test: Return True iff the board state is a goal state'''
-    if board.grid[3][1]=='1' and board.grid[3][2]=='1' and board.grid[4][1]=='1' \
-    and board.grid[4][2]=='1':
-        return True   # we are at a goal state; the 2x2 piece is by the exit
-    return False  # we are not at a goal state yet
-
-def heuristic(board):  
-    '''Heuristic function: takes in a board state and return the state's 
-    heuristic (h) value. This will use the Manhattan distance heuristic for 
-    the 2x2 piece.'''
-    for piece in board.pieces: 
-        if piece.is_goal: # only looking at the 2x2 goal tile
-            # the goal coordinates for the top left corner of 2x2 tile are [3][1] = [y][x]
-            return (abs(3 - piece.coord_y)+abs(1-piece.coord_x)) # Manhattan distance
-
-def find_goal_coords(y,x,board):
-    '''Given an x and y coordinate of a part of the 2x2 goal piece, find the
-    coordinates of the top left corner of the 2x2 goal piece.'''
-    c = '1'
-    # Corner cases:
-    if x == 0 and y == 0: # top left corner
-        x_coord = x # this is the top left corner of the 2x2 piece
-        y_coord = y
-    elif x == 0 and y == 4: # bottom left corner
-        x_coord = x
-        y_coord = y-1
-    elif x == 0 and y == 0: # top right corner
-        x_coord = x-1
-        y_coord = y
-    elif x == 3 and y == 4: # bottom right corner
-        x_coord = x-1
-        y_coord = y-1
-
-    # Edge cases (only looking left & up so ignore right & bottom edge):
-    elif x == 0: # left edge
-        if board.grid[y-1][x] == c:
-            y_coord = y-1   
-        else:
-            y_coord = y
-        x_coord = x
-    elif y == 0: # top edge
-        if board.grid[y][x-1] == c:
-            x_coord = x-1
-        else:
-            x_coord = x
-        y_coord = y
-    
-    else:   # General case in the middle of the board:
-        # Find the leftmost coordinate (x_coord)
-        if board.grid[y][x-1] == c:
-            x_coord = x-1
-            y_coord = y
-        else:
-            x_coord = x
-        # Find the topmost coordinate (y_coord)
-        if board.grid[y-1][x] == c:
-            y_coord = y-1   
-        else:
-            y_coord = y
-
-    return [y_coord, x_coord]
-
-def id_neighbour(y,x,board): 
-    '''Given an x & y coord of a part of a piece, find the coordinates of the 
-    top left corner of the piece. Return piece'''
-    res = [] # ATM, store the actual top left coords here of the piece: [y,x]
-
-    if board.grid[y][x] == '1': # goal piece
-        res = find_goal_coords(y,x,board)
-        # print(y,x)
-        # print("if1")
-        # print("res: ", res)
-    elif board.grid[y][x] == '<' or board.grid[y][x] == '^' or \
-    board.grid[y][x] == '2': # h left piece, v top piece, or 1x1 piece 
-        res.append(y)
-        res.append(x)
-        # print("if2")
-    elif board.grid[y][x] == '>': # h right piece
-        res.append(y)
-        res.append(x-1)
-        # print("if3")
-    elif board.grid[y][x] == 'v': # v bottom piece
-        res.append(y-1)
-        res.append(x)
-        # print("if4")
-    else: # must be the space
-        return None, None # return a piece that doesn't exist
-
-    for i in range(len(board.pieces)):
-        if board.pieces[i].coord_y == res[0] and board.pieces[i].coord_x == res[1]:
-            # return the piece object and its index in list of pieces:
-            return board.pieces[i], i #  format: (piece, i)
-
-def find_neighbours(y, x, res,board): #TODO: test
-    '''Given the x & y coords of one space, find a list of the neighbours (piece 
-    objects) and what direction they will try to move in towards the space.'''
-
-     # list of pieces to try to move: [('d', piece, i), ('d', piece, i)...]
-    # TODO: can i even call move with the 'd' and the piece itself as parameters?
-
-    if (y==0):   # top edge: can only look below, and neighbour tries to go up
-        piece, index = id_neighbour(1,x,board)
-        res.append(('u', piece, index))
-    if (y==4): # bottom edge: can only look above, and neighbour tries to go down
-        piece, index = id_neighbour(3,x,board)
-        res.append(('d', piece, index))
-    if y != 0 and y != 4: # middle y case
-        piece1, index1 = id_neighbour(y-1,x,board)
-        res.append(('d', piece1, index1))
-        piece2, index2 = id_neighbour(y+1,x,board)
-        res.append(('u', piece2, index2))
-    if (x==0): # left edge: can only look right, and neighbour tries to go left
-        piece, index = id_neighbour(y,1,board)
-        res.append(('l', piece, index))
-    if (x==3): # right edge: can only look left, and neighbour tries to go right
-        piece, index = id_neighbour(y,2,board)
-        res.append(('r', piece, index))
-    if x != 0 and x != 3: # middle x case
-        piece1, index1 = id_neighbour(y,x-1,board)
-        res.append(('r', piece1, index1))
-        piece2, index2 = id_neighbour(y,x+1,board)
-        res.append(('l', piece2, index2))
-        
-    return res # format: [('d', piece, i), ('d', piece, i)...]. [('d', None, i)] if space
-
-def is_valid_move(direction, piece, board):
-    '''Checks if a move for a certain piece is valid (if there are spaces 
-    in the correct positions. Return True if it works, and False otherwise.
-    N.B. Edge cases are not needed here becausse this will only be called 
-    if there is a space in the direction where we want to move.'''
-
-    if piece is None:   # two spaces next to each other
-        return False
-    elif piece.is_single:   # 1x1 piece
-        return True # always valid moving into a space
-    elif piece.is_goal: # 2x2 goal piece
-        if direction == 'l':
-            if board.grid[piece.coord_y][piece.coord_x-1] == '.' and \
-            board.grid[piece.coord_y+1][piece.coord_x-1] == '.':
-                return True
-            else:
-                return False
-        elif direction == 'r':
-            if board.grid[piece.coord_y][piece.coord_x+2] == '.' and \
-                board.grid[piece.coord_y+1][piece.coord_x+2] == '.':
-                return True
-            else:
-                return False
-        elif direction == 'u':
-            if board.grid[piece.coord_y-1][piece.coord_x] == '.' and \
-                board.grid[piece.coord_y-1][piece.coord_x+1] == '.':
-                return True
-            else:
-                return False
-        elif direction == 'd':
-            if board.grid[piece.coord_y+2][piece.coord_x] == '.' and \
-                board.grid[piece.coord_y+2][piece.coord_x+1] == '.':
-                return True
-            else:
-                return False
-    elif piece.orientation == 'h': # horizontal 1x2 piece
-        if direction == 'l' or direction == 'r': # always established there's a space where we want to try
-            return True
-        elif direction == 'u':
-            if board.grid[piece.coord_y-1][piece.coord_x] == '.' and \
-                board.grid[piece.coord_y-1][piece.coord_x+1] == '.':
-                return True
-            else:
-                return False
-        elif direction == 'd':
-            if board.grid[piece.coord_y+1][piece.coord_x] == '.' and \
-                board.grid[piece.coord_y+1][piece.coord_x+1] == '.':
-                return True
-            else:
-                return False
-    elif piece.orientation == 'v': # vertical 2x1 piece
-        if direction == 'u' or direction == 'd':
-            return True
-        elif direction == 'l':
-            if board.grid[piece.coord_y][piece.coord_x-1] == '.' and \
-                board.grid[piece.coord_y+1][piece.coord_x-1] == '.':
-                return True
-            else:
-                return False
-        elif direction == 'r':
-            if board.grid[piece.coord_y][piece.coord_x+1] == '.' and \
-                board.grid[piece.coord_y+1][piece.coord_x+1] == '.':
-                return True
-            else:
-                return False
-
-    pass
-
-def generate_successors(state, successors): #TODO: test
-    '''Take a state and return a list of its successor states'''
-    board = state.board
-    spaces = board.find_spaces() # format: [y,x,y,x]
-    # print(spaces)
-    space1 = [spaces[0], spaces[1]]
-    space2 = [spaces[2], spaces[3]]
-    # successors = [] # to store final successor boards
-    res = [] # list of possible moves 
-    res = find_neighbours(space1[0], space1[1],res, board) # format: [('d', piece), ('d', piece)...]. [('d', None)] if space
-    try_moves = find_neighbours(space2[0], space2[1],res,board)
-    #print(try_moves)
-    try_moves = set(try_moves) # remove duplicate move attempts
-    try_moves = list(try_moves) # convert back to list
-    # print(board.grid)
-    # print('moves to try',try_moves)
-    for attempt in try_moves:   # format: ('d', piece, i) for each attempt
-        if is_valid_move(attempt[0], attempt[1], board):
-            # print("valid move: ", attempt[0], attempt[1])
-            new_piece = deepcopy(attempt[1])   # duplicate the piece to move
-            new_piece.move(attempt[0])  # move the new piece in given direction (change its coordinates)
-            new_board = deepcopy(board.pieces)  # create new list of board pieces (duplicate)
-            new_board[attempt[2]] = new_piece # change the moved piece in the new board list
-            new_board = Board(new_board) # create new board with piece changes
-            # print("valid  move on new board:")
-            # new_board.display()
-
-            # Create new state:
-            # State parameters: board, f, depth, parent=None
-            new_state = State(new_board, (state.depth+1+heuristic(new_board)), \
-               state.depth+1, parent=state)
-            successors.append(new_state)
-
-            #TODO: how do i use the self.id in State for breaking ties?
-    return successors
-
-def get_solution(initial_state, goal_state):    #TODO: test
-    '''Given a goal state, backtrack through the parent state references until
-    initial state. Return sequence of states from the initial to the goal.'''
-    solution = [] # list of states to lead to given goal state
-    solution.append(goal_state)
-    p = goal_state.parent
-    while p != initial_state:
-        solution.insert(0, p)
-        p = p.parent
-    solution.insert(0,initial_state)
-    return solution
-
-def dfs(initial_state): #TODO
-    '''Given an initial state, return the first solution (goal_state) found
-    using the DFS with pruning algorithm.'''
-    frontier = [initial_state]
-    explored = set() 
-    while frontier:
-        curr = frontier.pop() # take out last state in frontier (stack)
-        if curr.board.grid_str not in explored:
-            # print("I'm exploring the current boards")
-            # curr.board.display()
-            #print()
-            explored.add(curr.board.grid_str)
-            if is_goal(curr.board):
-                # print("GOAL FOUND!")
-                return curr
-            frontier = generate_successors(curr, frontier)
-    return None
-
-def astar(initial_state): #TODO
-    '''Given an initial state, return the first solution (goal_state) found
-    using the A* with pruning algorithm.'''
-    # frontier is a heapq (priority q with lowest f value and its state at top)
-    # frontier format: [(f, state), (f, state)...]
-    frontier = [(initial_state.f, initial_state.id, initial_state)] 
-    explored = set()
-    while frontier:
-        curr_f, curr_id, curr = heappop(frontier)    # take out state with smallest f value
-        if curr.board.grid_str not in explored:
-            explored.add(curr.board.grid_str)
-            if is_goal(curr.board):
-                # print("number of moves: ", curr.depth)
-                return curr
-            for successor in generate_successors(curr, []):
-                heappush(frontier, (successor.f, successor.id, successor))
-    return 
-
-def convert_to_str(state):
-    '''Given a state, return a string representation of the board with proper
-    formatting (5x4).'''
-    res = ""    # string of board to return
-
-    for i in range(len(state.board.grid_str)):
-        res += state.board.grid_str[i]
-        if (i+1) % 4 == 0:
-            res += "\n"
-    
-    res += "\n"     # add newline at end of board
-
-    return res
-        
-
-def write_solution(solution, outputfile): #TODO
-    '''Given a list of states that lead from the initial state to the solved 
-    goal state, write the solution steps to the output file.'''
-
-    res = ""
-
-    file = open(outputfile, "w")
-    for state in solution:  # solution is a list of states
-        res += convert_to_str(state)
-        # file.write(state.board.display)
-    file.write(res)
-    file.close()
-
-if __name__ == "__main__":
-  
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "--inputfile",
-        type=str,
-        required=True,
-        help="The input file that contains the puzzle."
-    )
-    parser.add_argument(
-        "--outputfile",
-        type=str,
-        required=True,
-        help="The output file that contains the solution."
-    )
-    parser.add_argument(
-        "--algo",
-        type=str,
-        required=True,
-        choices=['astar', 'dfs'],
-        help="The searching algorithm."
-    )
-    args = parser.parse_args()
-
-    # read the board from the file
-    board = read_from_file(args.inputfile)
-    # print("initial state: ")
-    # board.display()
-    initial_state = State(board,heuristic(board),0)
-    # print()
-    time1 = time.time()
-    if args.algo == 'astar':
-        final_goal_state = astar(initial_state)
-        time2 = time.time()
-    elif args.algo == 'dfs':
-        final_goal_state = dfs(initial_state)
-        time2 = time.time()
-    solution = get_solution(initial_state, final_goal_state)
-    # print("elapsed time: ", time2-time1)
-    # print("number of moves: ", final_goal_state.depth)
-    write_solution(solution, args.outputfile)
-
-##################### DFS TESTING #####################
-    # time1 = time.time()
-    # print("STARTING DFS: ")
-    # goaal = dfs(initial_state)
-    # time2 = time.time()
-    # print("dfs solution: ")
-    # goaal.board.display()
-    # print()
-    # print("elapsed time: ", time2-time1)
-    # # print("solution path: ")
-    # # for step in get_solution(initial_state, goaal):
-    # #     step.board.display()
-    #     # print()
-
-    # print("heuristic: ", heuristic(goaal.board))
-
-##################### A* TESTING #####################
-    # time1 = time.time()
-    # print("STARTING A*: ")
-    # goaal = astar(initial_state)
-    # time2 = time.time()
-    # print("a* solution: ")
-    # goaal.board.display()
-    # print()
-    # print("elapsed time: ", time2-time1)
-    # # print("solution path: ")
-    # # for step in get_solution(initial_state, goaal):
-    # #     step.board.display()
-    # #     print()
-    
-    # print("heuristic: ", heuristic(goaal.board))
-
-
-
-
-
+from heapq import heappush, heappop, heapify, merge
+from array import array
+from bisect import bisect_left
+from collections import deque, OrderedDict
+import time
+import argparse
+import cProfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import glob
+import importlib.util
+import inspect
+import itertools
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import pstats
+import queue
+import resource
+import signal
+import sqlite3
+import struct
+import sys
+import tempfile
+import tracemalloc
+
+#====================================================================================
+
+char_goal = '1'
+char_single = '2'
+
+state_ids = itertools.count() # ids of States in order of creation
+
+class Piece:
+    """
+    This represents a piece on the Hua Rong Dao puzzle.
+    """
+
+    def __init__(self, is_goal, is_single, coord_x, coord_y, orientation):
+        """
+        :param is_goal: True if the piece is the goal piece and False otherwise.
+        :type is_goal: bool
+        :param is_single: True if this piece is a 1x1 piece and False otherwise.
+        :type is_single: bool
+        :param coord_x: The x coordinate of the top left corner of the piece.
+        :type coord_x: int
+        :param coord_y: The y coordinate of the top left corner of the piece.
+        :type coord_y: int
+        :param orientation: The orientation of the piece (one of 'h' or 'v') 
+            if the piece is a 1x2 piece. Otherwise, this is None
+        :type orientation: str
+        """
+
+        self.is_goal = is_goal
+        self.is_single = is_single
+        self.coord_x = coord_x  # for top left corner
+        self.coord_y = coord_y  # for top left corner
+        self.orientation = orientation
+
+    def __repr__(self): 
+        '''Prints out the attributes of a piece for debugging purposes.'''
+        return '{} {} {} {} {}'.format(self.is_goal, self.is_single, \
+            self.coord_x, self.coord_y, self.orientation)
+
+    def move(self, direction):
+        '''Moves a piece and updates its attributes. The direction can be 
+        left ('l'), right ('r'), up ('u'), down ('d'). The function will return
+        which direction the piece has moved or "Error" if it did not work.''' #TODO
+        if direction == 'l':
+            self.coord_x = self.coord_x-1
+        elif direction == 'r':
+            self.coord_x = self.coord_x+1
+        elif direction == 'u':
+            self.coord_y = self.coord_y-1
+        elif direction == 'd':
+            self.coord_y = self.coord_y+1
+        return 
+    
+class Board:
+    """
+    Board class for setting up the playing board.
+    """
+
+    def __init__(self, pieces, spec=None):
+        """
+        :param pieces: The list of Pieces
+        :type pieces: List[Piece]
+        :param spec: The puzzle the board belongs to (default: the spec in
+            use, see use_spec).
+        :type spec: Optional[PuzzleSpec]
+        """
+
+        self.spec = SPEC if spec is None else spec
+        self.width = self.spec.width
+        self.height = self.spec.height
+        self.pieces = pieces
+
+        # self.grid is a 2-d (size * size) array automatically generated
+        # using the information on the pieces when a board is being created.
+        # A grid contains the symbol for representing the pieces on the board.
+        self.grid = []
+        self.__construct_grid()
+
+    def __construct_grid(self):
+        """
+        Called in __init__ to set up a 2-d grid based on the piece location information.
+        """
+
+        for i in range(self.height):
+            line = []
+            for j in range(self.width):
+                line.append('.')
+            self.grid.append(line)
+
+        for piece in self.pieces: # converting the board into given form
+            if piece.is_goal:
+                self.grid[piece.coord_y][piece.coord_x] = char_goal
+                self.grid[piece.coord_y][piece.coord_x + 1] = char_goal
+                self.grid[piece.coord_y + 1][piece.coord_x] = char_goal
+                self.grid[piece.coord_y + 1][piece.coord_x + 1] = char_goal
+            elif piece.is_single:
+                self.grid[piece.coord_y][piece.coord_x] = char_single
+            else:
+                if piece.orientation == 'h':  # horizontal 1x2 piece
+                    self.grid[piece.coord_y][piece.coord_x] = '<'
+                    self.grid[piece.coord_y][piece.coord_x + 1] = '>'
+                elif piece.orientation == 'v':  # vertical 2x1 piece
+                    #print(self.grid)
+                    #print(piece.coord_y, piece.coord_x)
+                    self.grid[piece.coord_y][piece.coord_x] = '^'
+                    self.grid[piece.coord_y + 1][piece.coord_x] = 'v'
+                    #sprint('success')
+        
+        # Create string of grid content to be used in explored set comparison
+        self.grid_str = ''
+        for row in self.grid:
+            self.grid_str += ''.join(row) # format: '11<>11^2^^v2vv22<>..'
+    
+    def convert_line_to_grid(self, line):
+        '''Converts a line of characters into a 2-d grid.'''
+        grid = []
+        for i in range(self.height):
+            grid.append(line[i*self.width:(i+1)*self.width])
+        return grid
+
+    def display(self):
+        """
+        Print out the current board. If f is not None, print to the file f.
+        """
+
+        for i, line in enumerate(self.grid):
+            for ch in line:
+                print(ch, end='')
+            print()
+        # else:
+        #     for i, line in enumerate(self.grid):
+        #         print(self.convert_line_to_grid(line), file=f)
+                # for ch in line:
+                #     print(ch, end='', file=f)
+                    # f.write(ch)
+
+    
+    def find_spaces(self): 
+        '''Return the coordinates of the  empty spaces on the board.''' #TODO
+        spaces = [] # to store result
+        # Iterate through each grid space on the board to find empty tiles:
+        for i in range(self.height):
+            for j in range(self.width):
+                if self.grid[i][j] == '.':
+                    spaces.append(i)
+                    spaces.append(j)
+
+        return spaces # example format: [4,1,4,2] where [4][1] is a space and 
+                      # [4][2] is the location of another space 
+
+class State:
+    """
+    State class wrapping a board key with some extra current state information.
+    Note that State and Board are different. Board has the locations of the pieces.
+    State has the integer key of a board (see board_to_key) and some extra
+    information that is relevant to the search: f value, current depth and parent.
+    The Board itself is only decoded from the key when it is asked for.
+    """
+
+    def __init__(self, key, f, depth, parent=None):
+        """
+        :param key: The integer key of the board of the state.
+        :type key: int
+        :param f: The f value of current state.
+        :type f: int
+        :param depth: The depth of current state in the search tree.
+        :type depth: int
+        :param parent: The parent of current state.
+        :type parent: Optional[State]
+        """
+        self.key = key
+        self.f = f
+        self.depth = depth # number of states from intial to goal state (cost: g)
+        self.parent = parent
+        self.id = next(state_ids)  # The id for breaking ties.
+
+        # Each state keeps track of heuristic and f value - get this from the
+        # helper function heuristic_key(key) to give h value. f = g + h
+
+    @property
+    def board(self):
+        '''The Board of this state, decoded from its key.'''
+        return key_to_board(self.key)
+
+class SearchStats:
+    """
+    Counts of the work done by a search. With timing on, the searches also
+    add up the time spent in each kind of work (see timer): generating
+    successors, computing the heuristic, frontier operations and building
+    the path to the goal. Timing slows the search down.
+    """
+
+    def __init__(self, timing=False):
+        self.expanded = 0  # states taken off the frontier and expanded
+        self.generated = 0  # successor states created
+        self.duplicates = 0  # states dropped because their board was reached before
+        self.max_frontier = 0  # most states waiting on the frontier at once
+        self.bound = None  # the solution is at most this many times optimal
+        self.explored = 0  # states kept in the search tables (astar and dfs)
+        self.table_bytes = 0  # bytes held by those tables at the end
+        self.disk_bytes = 0  # most bytes of files on disk at once (ddbfs)
+        self.evicted = 0  # entries dropped from a full transposition table (idastar)
+        self.timing = timing
+        self.seconds = {}  # kind of work -> seconds spent in it
+
+    def bytes_per_state(self):
+        '''Return the memory of the search tables per explored state.'''
+        return self.table_bytes / self.explored if self.explored else 0.0
+
+    def timer(self, name, function):
+        '''Return function, wrapped to add the time spent in it to
+        seconds[name] if timing is on.'''
+        if not self.timing:
+            return function
+        seconds = self.seconds
+        seconds.setdefault(name, 0.0)
+        clock = time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            try:
+                return function(*args)
+            finally:
+                seconds[name] += clock() - start
+        return timed
+
+    def as_dict(self):
+        '''Return the counts and times as a dict that can be written as JSON.'''
+        result = {'expanded': self.expanded, 'generated': self.generated,
+                  'duplicates': self.duplicates,
+                  'max_frontier': self.max_frontier}
+        if self.bound is not None:
+            result['bound'] = round(self.bound, 3)
+        if self.explored:
+            result['explored'] = self.explored
+            result['bytes_per_state'] = round(self.bytes_per_state(), 1)
+        if self.disk_bytes:
+            result['disk_bytes'] = self.disk_bytes
+        if self.evicted:
+            result['evicted'] = self.evicted
+        if self.timing:
+            result['time'] = {name: round(seconds, 4)
+                              for name, seconds in self.seconds.items()}
+        return result
+
+def parse_pieces(lines):
+    """
+    Build the list of pieces from the rows of a board drawn with the puzzle
+    characters (the same format as the input file).
+
+    :param lines: The rows of the board.
+    :type lines: Iterable[str]
+    :return: The pieces on the board
+    :rtype: List[Piece]
+    """
+
+    line_index = 0
+    pieces = []
+    g_found = False
+
+    for line in lines:
+
+        for x, ch in enumerate(line):
+
+            if ch == '^': # found vertical piece
+                pieces.append(Piece(False, False, x, line_index, 'v'))
+            elif ch == '<': # found horizontal piece
+                pieces.append(Piece(False, False, x, line_index, 'h'))
+            elif ch == char_single:
+                pieces.append(Piece(False, True, x, line_index, None))
+            elif ch == char_goal:
+                if g_found == False:
+                    pieces.append(Piece(True, False, x, line_index, None))
+                    g_found = True
+        line_index += 1
+
+    return pieces
+
+def read_from_file(filename, goal=None):
+    """
+    Load initial board from a given file. Read in a puzzle, and switch to the
+    spec of its size and number of empty cells (see use_spec).
+
+    :param filename: The name of the given file.
+    :type filename: str
+    :param goal: Where the 2x2 piece has to end up (see PuzzleSpec).
+    :type goal: Optional[Tuple[int, int]]
+    :return: A loaded board
+    :rtype: Board
+    """
+
+    puzzle_file = open(filename, "r")
+    lines = puzzle_file.read().splitlines()
+    puzzle_file.close()
+
+    use_spec(PuzzleSpec.from_rows(lines, goal))
+    board = Board(parse_pieces(lines))
+
+    return board
+
+##############################################################################
+################  STATE ENCODING: ############################################
+##############################################################################
+
+# The search works on integer keys instead of Boards. Every cell of the grid
+# gets BITS bits holding the code of its character, cell i = y*WIDTH + x
+# sits at bit BITS*i. Like grid_str, a key does not tell apart pieces of the
+# same shape, and the mapping between keys and grid strings is one to one.
+BITS = 3
+CELL_MASK = (1 << BITS) - 1
+CODE_CHARS = '.' + char_goal + char_single + '<>^v'
+CHAR_CODES = {ch: code for code, ch in enumerate(CODE_CHARS)}
+EMPTY, GOAL, SINGLE, LEFT, RIGHT, TOP, BOTTOM = range(len(CODE_CHARS))
+
+class PuzzleSpec:
+    """
+    The geometry of a puzzle: the size of the board, the number of empty
+    cells and where the 2x2 piece has to end up. The pieces are the four
+    shapes of SHAPES. The searches read the tables of one spec at a time
+    from module level (WIDTH, GOAL_CELLS, MOVES, ...), see use_spec.
+    """
+
+    def __init__(self, width=4, height=5, blanks=2, goal=None):
+        """
+        :param width: The number of columns.
+        :type width: int
+        :param height: The number of rows.
+        :type height: int
+        :param blanks: The number of empty cells.
+        :type blanks: int
+        :param goal: The (x, y) cell of the top left corner of the 2x2 piece
+            in a goal board (default: the middle of the two bottom rows).
+        :type goal: Optional[Tuple[int, int]]
+        """
+
+        if goal is None:
+            goal = ((width - 2) // 2, height - 2)
+        if width < 2 or height < 2 or blanks < 1:
+            raise ValueError("the board needs room for the 2x2 piece and an empty cell")
+        if width > 6: # MIRROR_ROW has an entry for every row of the board
+            raise ValueError("boards wider than 6 cells are not supported")
+        if not (0 <= goal[0] <= width - 2 and 0 <= goal[1] <= height - 2):
+            raise ValueError("the goal of the 2x2 piece is off the board")
+        self.width = width
+        self.height = height
+        self.blanks = blanks
+        self.goal = tuple(goal)
+
+    def __eq__(self, other):
+        return isinstance(other, PuzzleSpec) and self.fields() == other.fields()
+
+    def __hash__(self):
+        return hash(self.fields())
+
+    def __repr__(self):
+        return 'PuzzleSpec({}, {}, {}, {})'.format(*self.fields())
+
+    def fields(self):
+        return self.width, self.height, self.blanks, self.goal
+
+    @property
+    def name(self):
+        '''A short name: the size, like 4x5, followed by the number of empty
+        cells and the goal if they are not the default ones.'''
+        name = '{}x{}'.format(self.width, self.height)
+        if self.blanks != 2:
+            name += '-{}blanks'.format(self.blanks)
+        if self.goal != PuzzleSpec(self.width, self.height).goal:
+            name += '-goal{},{}'.format(*self.goal)
+        return name
+
+    @property
+    def symmetric(self):
+        '''True iff the goal is in the middle, so that a board and its mirror
+        image need the same number of moves.'''
+        return self.goal[0] == self.width - 2 - self.goal[0]
+
+    @classmethod
+    def from_rows(cls, rows, goal=None):
+        '''Return the spec of a board drawn as rows (the format of the input
+        file): its size and number of empty cells.'''
+        rows = [row.rstrip() for row in rows if row.strip()]
+        if not rows or any(len(row) != len(rows[0]) for row in rows):
+            raise ValueError("the rows of the board are not all the same length")
+        return cls(len(rows[0]), len(rows), sum(row.count('.') for row in rows), goal)
+
+CLASSIC = PuzzleSpec() # the board of Hua Rong Dao
+SPEC = CLASSIC # the spec whose tables are in use (see use_spec)
+
+# The tables below are those of the classic board. use_spec replaces them
+# with the tables of another spec, built the first time it is used.
+WIDTH = CLASSIC.width
+HEIGHT = CLASSIC.height
+BLANKS = CLASSIC.blanks
+GOAL_X, GOAL_Y = CLASSIC.goal
+CELLS = WIDTH * HEIGHT
+KEY_WORDS = -(-BITS * CELLS // 64) # 64 bit words needed to hold a key
+
+LOW_BITS = sum(1 << (BITS * i) for i in range(CELLS)) # lowest bit of each cell
+
+def goal_tables():
+    '''Return GOAL_CELLS (the cells the 2x2 piece covers in a goal board,
+    [3][1], [3][2], [4][1], [4][2] on the classic board), GOAL_MASK,
+    GOAL_VALUE and GOAL_DISTANCE: the Manhattan distance to the exit keyed
+    on the lowest bit of the top left cell of the 2x2 piece (see
+    heuristic_key).'''
+    cells = (GOAL_Y*WIDTH + GOAL_X, GOAL_Y*WIDTH + GOAL_X + 1,
+             (GOAL_Y + 1)*WIDTH + GOAL_X, (GOAL_Y + 1)*WIDTH + GOAL_X + 1)
+    mask = sum(CELL_MASK << (BITS * i) for i in cells)
+    value = sum(GOAL << (BITS * i) for i in cells)
+    distance = {1 << (BITS * (y*WIDTH + x)): abs(GOAL_Y - y) + abs(GOAL_X - x)
+                for y in range(HEIGHT - 1) for x in range(WIDTH - 1)}
+    return cells, mask, value, distance
+
+GOAL_CELLS, GOAL_MASK, GOAL_VALUE, GOAL_DISTANCE = goal_tables()
+
+def board_to_key(board):
+    '''Encode a board as an integer key, switching to the spec of the board
+    (see use_spec).'''
+    use_spec(board.spec)
+    key = 0
+    for i, ch in enumerate(board.grid_str):
+        key |= CHAR_CODES[ch] << (BITS * i)
+    return key
+
+def key_to_str(key):
+    '''Decode a key into the grid string of its board (see Board.grid_str).'''
+    return ''.join(CODE_CHARS[(key >> (BITS * i)) & CELL_MASK]
+                   for i in range(CELLS))
+
+def key_to_board(key):
+    '''Decode a key into a Board.'''
+    grid_str = key_to_str(key)
+    lines = [grid_str[i:i+WIDTH] for i in range(0, CELLS, WIDTH)]
+    return Board(parse_pieces(lines))
+
+def cells_with_code(key, code):
+    '''Return an int with the lowest bit set of every cell of the key holding
+    the given code.'''
+    x = key ^ (LOW_BITS * code) # cells holding code become 0
+    return ~(x | (x >> 1) | (x >> 2)) & LOW_BITS
+
+def is_goal_key(key):
+    '''Goal Test on a key: True iff the 2x2 piece is by the exit.'''
+    return key & GOAL_MASK == GOAL_VALUE
+
+def heuristic_key(key):
+    '''Manhattan distance heuristic of the 2x2 piece (see heuristic) on a key.'''
+    ones = cells_with_code(key, GOAL)
+    return GOAL_DISTANCE[ones & -ones]
+
+# The pieces as (dy, dx, code) for each of their cells from the top left one
+SHAPES = (((0, 0, GOAL), (0, 1, GOAL), (1, 0, GOAL), (1, 1, GOAL)),
+          ((0, 0, SINGLE),),
+          ((0, 0, LEFT), (0, 1, RIGHT)),
+          ((0, 0, TOP), (1, 0, BOTTOM)))
+
+DIRECTIONS = (('u', -1, 0), ('d', 1, 0), ('l', 0, -1), ('r', 0, 1))
+
+def shape_moves(shape):
+    """
+    List every move of a piece of the given shape, anywhere on the board.
+    A move is a tuple (mask, value, delta, anchor, direction, entering): the
+    piece with its top left corner at cell anchor is on the board iff
+    key & mask == value, the move needs key & entering == 0 (the cells the
+    piece moves into are empty), and the new key is key ^ delta.
+
+    :param shape: The piece as (dy, dx, code) for each of its cells.
+    :type shape: Tuple[Tuple[int, int, int]]
+    :return: The moves
+    :rtype: List[Tuple[int, int, int, int, str, int]]
+    """
+
+    moves = []
+    for y in range(HEIGHT):
+        for x in range(WIDTH):
+            if any(y + dy >= HEIGHT or x + dx >= WIDTH for dy, dx, _ in shape):
+                continue
+            old = {(y + dy)*WIDTH + x + dx: code for dy, dx, code in shape}
+            for direction, my, mx in DIRECTIONS:
+                if any(not (0 <= y + dy + my < HEIGHT and 0 <= x + dx + mx < WIDTH)
+                       for dy, dx, _ in shape):
+                    continue
+                new = {i + my*WIDTH + mx: code for i, code in old.items()}
+                mask = value = delta = entering = 0
+                for i, code in old.items():
+                    mask |= CELL_MASK << (BITS * i)
+                    value |= code << (BITS * i)
+                for i in set(old) | set(new):
+                    delta |= (old.get(i, EMPTY) ^ new.get(i, EMPTY)) << (BITS * i)
+                    if i not in old:
+                        entering |= CELL_MASK << (BITS * i)
+                moves.append((mask, value, delta, y*WIDTH + x, direction, entering))
+    return moves
+
+def build_move_table():
+    """
+    Build the table of every move on the board, keyed on the cells that are
+    empty before the move (in the format returned by cells_with_code(key, EMPTY)).
+    A move is a tuple (mask, value, delta, anchor, direction) as in shape_moves:
+    with BLANKS empty cells, key & mask == value is the only check left.
+
+    :return: The move table
+    :rtype: Dict[int, Tuple[Tuple[int, int, int, int, str]]]
+    """
+
+    table = {}
+    for cells in itertools.combinations(range(CELLS), BLANKS):
+        table[sum(1 << (BITS * i) for i in cells)] = []
+
+    for shape in SHAPES:
+        for *move, entering in shape_moves(shape):
+            # the move is listed under every set of empty cells
+            # that contains the cells the piece moves into
+            needed = [i for i in range(CELLS) if entering >> (BITS * i) & 1]
+            others = [i for i in range(CELLS) if i not in needed]
+            for cells in itertools.combinations(others, BLANKS - len(needed)):
+                empty = sum(1 << (BITS * i) for i in needed + list(cells))
+                table[empty].append(tuple(move))
+
+    return {empty: tuple(moves) for empty, moves in table.items()}
+
+MOVES = build_move_table()
+
+def key_successors(key):
+    '''Take a key and return the keys of all of the boards one move away.
+    The empty cells of the key pick the moves to try out of MOVES, and a move
+    is made if its piece is on the board.'''
+    return [key ^ delta for mask, value, delta, _, _ in
+            MOVES.get(cells_with_code(key, EMPTY), ()) if key & mask == value]
+
+# Mirror images (flipped left to right) of boards are explored only once: the
+# board and the exit are symmetric, so a board and its mirror image need the
+# same number of moves. MIRROR_ROW maps the bits of a row to those of the
+# mirrored row, where the cells are reversed and '<' and '>' swap places.
+MIRROR_CODES = list(range(1 << BITS))
+MIRROR_CODES[LEFT], MIRROR_CODES[RIGHT] = RIGHT, LEFT
+
+def mirror_tables(symmetric=True):
+    '''Return ROW_BITS, ROW_MASK, ROW_SHIFTS and MIRROR_ROW. When the exit is
+    not in the middle, MIRROR_ROW leaves the rows as they are, so every key
+    is its own canonical key.'''
+    row_bits = BITS * WIDTH
+    if symmetric:
+        mirror_row = tuple(
+            sum(MIRROR_CODES[(row >> (BITS * x)) & CELL_MASK] << (BITS * (WIDTH - 1 - x))
+                for x in range(WIDTH))
+            for row in range(1 << row_bits))
+    else:
+        mirror_row = range(1 << row_bits)
+    return (row_bits, (1 << row_bits) - 1,
+            tuple(range(0, BITS * CELLS, row_bits)), mirror_row)
+
+ROW_BITS, ROW_MASK, ROW_SHIFTS, MIRROR_ROW = mirror_tables()
+
+def mirror_key(key):
+    '''Return the key of the mirror image of a board.'''
+    mirrored = 0
+    for shift in ROW_SHIFTS:
+        mirrored |= MIRROR_ROW[(key >> shift) & ROW_MASK] << shift
+    return mirrored
+
+def canonical_key(key):
+    '''Return the key that stands for both a board and its mirror image (the
+    smaller of the two).'''
+    mirrored = mirror_key(key)
+    return mirrored if mirrored < key else key
+
+def canonical_successors(key):
+    '''Like key_successors, but returns the canonical key of each successor.'''
+    return [canonical_key(key ^ delta) for mask, value, delta, _, _ in
+            MOVES.get(cells_with_code(key, EMPTY), ()) if key & mask == value]
+
+def unmirror_keys(keys):
+    '''Given a path of canonical keys starting from an actual board, mirror
+    the keys where needed so that each board is one move away from the last.
+    Mirror images commute with moves, so the keys are fixed in one pass.'''
+    path = [keys[0]]
+    for key in keys[1:]:
+        if key not in key_successors(path[-1]):
+            key = mirror_key(key)
+        path.append(key)
+    return path
+
+# The module level names that hold the tables of a spec
+SPEC_TABLES = ('WIDTH', 'HEIGHT', 'BLANKS', 'GOAL_X', 'GOAL_Y', 'CELLS', 'KEY_WORDS',
+               'LOW_BITS', 'GOAL_CELLS', 'GOAL_MASK', 'GOAL_VALUE', 'GOAL_DISTANCE',
+               'MOVES', 'ROW_BITS', 'ROW_MASK', 'ROW_SHIFTS', 'MIRROR_ROW',
+               'GOAL_ROWS_SHIFT', 'GOAL_ROWS_GAP')
+spec_tables = {} # spec -> {name in SPEC_TABLES: table}
+
+def use_spec(spec):
+    '''Put the tables of a spec at module level, where the searches read them,
+    building them the first time the spec is used. The tables of the classic
+    board are the ones built when the module is loaded.'''
+    global SPEC, vector_tables
+    if spec == SPEC:
+        return
+    module = globals()
+    spec_tables.setdefault(SPEC, {name: module[name] for name in SPEC_TABLES})
+    tables = spec_tables.get(spec)
+    if tables is None:
+        module.update(WIDTH=spec.width, HEIGHT=spec.height, BLANKS=spec.blanks,
+                      GOAL_X=spec.goal[0], GOAL_Y=spec.goal[1],
+                      CELLS=spec.width * spec.height)
+        module.update(KEY_WORDS=-(-BITS * CELLS // 64),
+                      LOW_BITS=sum(1 << (BITS * i) for i in range(CELLS)))
+        module.update(zip(('GOAL_CELLS', 'GOAL_MASK', 'GOAL_VALUE', 'GOAL_DISTANCE'),
+                          goal_tables()))
+        module.update(zip(('ROW_BITS', 'ROW_MASK', 'ROW_SHIFTS', 'MIRROR_ROW'),
+                          mirror_tables(spec.symmetric)))
+        module.update(MOVES=build_move_table(), GOAL_ROWS_SHIFT=BITS * GOAL_CELLS[0],
+                      GOAL_ROWS_GAP=BITS * WIDTH)
+        tables = spec_tables[spec] = {name: module[name] for name in SPEC_TABLES}
+    module.update(tables)
+    SPEC = spec
+    vector_tables = None # built again for the new spec when needed
+
+##############################################################################
+################  HELPER FUNCTIONS: ##########################################
+##############################################################################
+
+def is_goal(board):
+    '''Goal Test: Return True iff the board state is a goal state'''
+    x, y = board.spec.goal
+    if board.grid[y][x]=='1' and board.grid[y][x+1]=='1' and board.grid[y+1][x]=='1' \
+    and board.grid[y+1][x+1]=='1':
+        return True   # we are at a goal state; the 2x2 piece is by the exit
+    return False  # we are not at a goal state yet
+
+def heuristic(board):
+    '''Heuristic function: takes in a board state and return the state's
+    heuristic (h) value. This will use the Manhattan distance heuristic for
+    the 2x2 piece.'''
+    x, y = board.spec.goal
+    for piece in board.pieces:
+        if piece.is_goal: # only looking at the 2x2 goal tile
+            # the goal coordinates for the top left corner of 2x2 tile are [3][1] = [y][x]
+            # on the classic board
+            return (abs(y - piece.coord_y)+abs(x-piece.coord_x)) # Manhattan distance
+
+def search_root(initial_state):
+    '''Return the state a search starts from: the initial state with its key
+    made canonical.'''
+    return State(canonical_key(initial_state.key), initial_state.f,
+                 initial_state.depth)
+
+def get_solution(initial_state, goal_state):    #TODO: test
+    '''Given a goal state, backtrack through the parent state references until
+    the root of the search, which stands for the initial state. Return sequence
+    of states from the initial to the goal, with the boards mirrored back
+    where the search used the mirror image (see unmirror_keys).'''
+    solution = [] # list of states to lead to given goal state, goal first
+    p = goal_state
+    while p.parent is not None:
+        solution.append(p)
+        p = p.parent
+    solution.append(initial_state)
+    solution.reverse()
+    keys = unmirror_keys([state.key for state in solution])
+    for state, key in zip(solution, keys):
+        state.key = key
+    return solution
+
+def trace_path(parents, key):
+    '''Given a dict from each key reached by a search to the key it was
+    reached from (None for the root), return the path of keys from the root
+    to key.'''
+    path = []
+    while key is not None:
+        path.append(key)
+        key = parents[key]
+    path.reverse()
+    return path
+
+def table_bytes(*tables):
+    '''Return the number of bytes held by the dicts and sets of a search,
+    with their keys (the values are keys from the same tables or small ints).'''
+    size = 0
+    for table in tables:
+        size += sys.getsizeof(table)
+        if table is tables[0]:
+            size += sum(sys.getsizeof(key) for key in table)
+    return size
+
+def key_moves(key, h=None):
+    '''Generate the deltas of the moves that can be made from a key: the key
+    after a move is key ^ delta, and key ^ delta ^ delta is key again. With a
+    heuristic h on keys, the moves to boards with a lower h come first.'''
+    moves = MOVES.get(cells_with_code(key, EMPTY), ())
+    if h is None:
+        for mask, value, delta, _, _ in moves:
+            if key & mask == value:
+                yield delta
+        return
+    here = h(key)
+    for mask, value, delta, _, _ in moves:
+        if key & mask == value and h(key ^ delta) < here:
+            yield delta
+    for mask, value, delta, _, _ in moves:
+        if key & mask == value and h(key ^ delta) >= here:
+            yield delta
+
+def dfs(initial_state, stats=None, depth_limit=None, h=None): #TODO
+    '''Given an initial state, return the first solution (goal_state) found
+    using the DFS with pruning algorithm. The work done is counted in stats.
+
+    Only one key is kept for the board being searched: moves are made on it
+    and undone on the way back (see key_moves). The frontier is the stack of
+    the moves made so far, with a generator of the moves left to try at each
+    depth, ordered by the heuristic h on keys (None to keep the order of
+    MOVES). Boards are not searched deeper than depth_limit moves, and with a
+    limit a board reached again at a lower depth is searched again.'''
+    if stats is None:
+        stats = SearchStats()
+    key = initial_state.key
+    if is_goal_key(key):
+        return path_to_goal_state([key])
+    # visited holds the canonical key of every board reached, with the least
+    # depth it was reached at if there is a depth limit.
+    visited = {canonical_key(key): 0}
+    made = []  # the delta of each move made from the initial board
+    untried = [key_moves(key, h)]  # the moves left to try at each depth
+    stats.expanded += 1
+    try:
+        while untried:
+            for delta in untried[-1]:
+                stats.generated += 1
+                key ^= delta # make the move
+                depth = len(made) + 1
+                seen = visited.get(canonical_key(key))
+                if seen is not None and (depth_limit is None or seen <= depth):
+                    stats.duplicates += 1
+                    key ^= delta # undo it
+                    continue
+                visited[canonical_key(key)] = depth
+                made.append(delta)
+                if is_goal_key(key):
+                    path = [initial_state.key]
+                    for delta in made:
+                        path.append(path[-1] ^ delta)
+                    return stats.timer('path', path_to_goal_state)(path)
+                if depth_limit is not None and depth >= depth_limit:
+                    made.pop()
+                    key ^= delta
+                    continue
+                stats.expanded += 1
+                untried.append(key_moves(key, h))
+                if depth > stats.max_frontier:
+                    stats.max_frontier = depth
+                break
+            else: # no moves left here: go back up
+                untried.pop()
+                if made:
+                    key ^= made.pop()
+        return None
+    finally:
+        stats.explored = len(visited)
+        stats.table_bytes = table_bytes(visited)
+
+class BucketQueue:
+    """
+    Priority queue for astar. f values are small integers, so there is one
+    bucket per f value, holding one stack of states per depth. pop takes the
+    deepest state with the least f: among states with the same f, the deeper
+    ones are closer to a goal.
+    """
+
+    def __init__(self):
+        self.buckets = []  # buckets[f][depth] is a stack of states
+        self.counts = []  # number of states in each bucket
+        self.min_f = 0  # no bucket below this one has states
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, f, depth, state):
+        '''Add a state with the given f value and depth.'''
+        while len(self.buckets) <= f:
+            self.buckets.append([])
+            self.counts.append(0)
+        stacks = self.buckets[f]
+        while len(stacks) <= depth:
+            stacks.append([])
+        stacks[depth].append(state)
+        self.counts[f] += 1
+        self.size += 1
+        if f < self.min_f:
+            self.min_f = f
+
+    def pop(self):
+        '''Remove the deepest state with the least f value and return
+        (f, depth, state).'''
+        while not self.counts[self.min_f]:
+            self.min_f += 1
+        stacks = self.buckets[self.min_f]
+        while not stacks[-1]:
+            stacks.pop()
+        self.counts[self.min_f] -= 1
+        self.size -= 1
+        return self.min_f, len(stacks) - 1, stacks[-1].pop()
+
+def astar(initial_state, h=heuristic_key, stats=None, exact=None,
+          best_depth=None): #TODO
+    '''Given an initial state, return the first solution (goal_state) found
+    using the A* with pruning algorithm. h is the heuristic on keys and the
+    work done is counted in stats. exact optionally maps keys whose h is
+    their exact distance to the goal to the next key of an optimal path from
+    them: the search stops at the first of them it takes out, like at a goal,
+    and follows the path from there. best_depth, if given, is a dict that is
+    filled with the least depth each key was reached at.'''
+    if stats is None:
+        stats = SearchStats()
+    # frontier is a BucketQueue of keys (deepest key with the lowest f value
+    # first). A successor is only queued if it was not reached at the same or
+    # a lower depth before, so there are no duplicates to skip when taking
+    # keys out, except ones reached at a lower depth since they were queued.
+    # The parent of every key is kept in parents, and the goal state is only
+    # built from them at the end.
+    root = search_root(initial_state)
+    frontier = BucketQueue()
+    frontier.push(root.f, 0, root.key)
+    parents = {root.key: None}
+    if best_depth is None:
+        best_depth = {}
+    best_depth[root.key] = 0 # least depth each canonical key was reached at
+    successors = stats.timer('successors', canonical_successors)
+    h = stats.timer('heuristic', h)
+    push = stats.timer('frontier', frontier.push)
+    pop = stats.timer('frontier', frontier.pop)
+    try:
+        while frontier:
+            f, curr_depth, curr = pop() # take out key with smallest f value
+            if curr_depth > best_depth[curr]:
+                stats.duplicates += 1
+                continue # reached at a lower depth since it was queued
+            if is_goal_key(curr) or (exact is not None and curr in exact):
+                # print("number of moves: ", curr_depth)
+                path = trace_path(parents, curr)
+                while not is_goal_key(path[-1]):
+                    path.append(exact[path[-1]])
+                return stats.timer('path', path_to_goal_state)(path)
+            stats.expanded += 1
+            depth = curr_depth + 1
+            for key in successors(curr):
+                stats.generated += 1
+                if best_depth.get(key, depth + 1) <= depth:
+                    stats.duplicates += 1
+                    continue
+                best_depth[key] = depth
+                parents[key] = curr
+                push(depth + h(key), depth, key)
+            if len(frontier) > stats.max_frontier:
+                stats.max_frontier = len(frontier)
+        return
+    finally:
+        stats.explored = len(parents)
+        stats.table_bytes = table_bytes(parents, best_depth)
+
+##############################################################################
+################  GOAL DISTANCE DATABASE: ####################################
+##############################################################################
+
+# A distance database holds the exact number of moves to the goal of every
+# canonical board that can reach a goal board, for one set of pieces. The
+# file is a header followed by the sorted keys (8 bytes each) and their
+# distances (1 byte each), all in little endian byte order so that a file
+# built on one machine reads the same on another. On little endian machines
+# (nearly all of them) it is memory mapped and searched in place.
+DB_MAGIC = b'HRDDB001'
+DB_HEADER = struct.Struct('<8sIBBBx') # magic, count, 1x1s, horizontals, verticals
+
+def write_little_endian(file, values):
+    '''Write an array (see array.array) to a file in little endian byte order.'''
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    values.tofile(file)
+
+def read_little_endian(view, typecode):
+    '''Return the little endian values of a memoryview as a sequence of the
+    array typecode: the view itself on a little endian machine, else a copy
+    with the bytes swapped.'''
+    if sys.byteorder == 'little':
+        return view.cast(typecode)
+    values = array(typecode, view.tobytes())
+    values.byteswap()
+    return values
+
+def piece_counts(key):
+    '''Return the number of (1x1, horizontal, vertical) pieces on a board.'''
+    return (cells_with_code(key, SINGLE).bit_count(),
+            cells_with_code(key, LEFT).bit_count(),
+            cells_with_code(key, TOP).bit_count())
+
+def fill_keys(key, taken, counts):
+    """
+    Enumerate the boards made by filling the cells of a key that are not
+    taken with the given pieces, leaving the other cells empty.
+
+    :param key: The key with the pieces placed so far.
+    :type key: int
+    :param taken: The cells of those pieces, bit i for cell i.
+    :type taken: int
+    :param counts: The number of (1x1, horizontal, vertical) pieces to add.
+    :type counts: Tuple[int, int, int]
+    :return: The canonical keys of the boards
+    :rtype: Set[int]
+    """
+
+    singles, horizontals, verticals = counts
+    blanks = CELLS - bin(taken).count('1') - singles - 2*horizontals - 2*verticals
+    keys = set()
+
+    def place(key, taken, s, h, v, e):
+        # fill the first cell not taken yet with each piece that fits there
+        i = 0
+        while i < CELLS and taken >> i & 1:
+            i += 1
+        if i == CELLS:
+            keys.add(canonical_key(key))
+            return
+        y, x = divmod(i, WIDTH)
+        shift = BITS * i
+        if e:
+            place(key, taken | 1 << i, s, h, v, e - 1)
+        if s:
+            place(key | SINGLE << shift, taken | 1 << i, s - 1, h, v, e)
+        if h and x < WIDTH - 1 and not taken >> (i + 1) & 1:
+            place(key | LEFT << shift | RIGHT << (shift + BITS),
+                  taken | 3 << i, s, h - 1, v, e)
+        if v and y < HEIGHT - 1 and not taken >> (i + WIDTH) & 1:
+            place(key | TOP << shift | BOTTOM << (shift + BITS*WIDTH),
+                  taken | 1 << i | 1 << (i + WIDTH), s, h, v - 1, e)
+
+    if blanks >= 0:
+        place(key, taken, singles, horizontals, verticals, blanks)
+    return keys
+
+def goal_keys(counts):
+    """
+    Enumerate the goal boards (see is_goal) with the given pieces.
+
+    :param counts: The number of (1x1, horizontal, vertical) pieces.
+    :type counts: Tuple[int, int, int]
+    :return: The canonical keys of the goal boards
+    :rtype: Set[int]
+    """
+
+    return fill_keys(GOAL_VALUE, sum(1 << i for i in GOAL_CELLS), counts)
+
+def all_keys(counts):
+    """
+    Enumerate every board with the given pieces, wherever the 2x2 piece is.
+
+    :param counts: The number of (1x1, horizontal, vertical) pieces.
+    :type counts: Tuple[int, int, int]
+    :return: The canonical keys of the boards
+    :rtype: Set[int]
+    """
+
+    keys = set()
+    for y in range(HEIGHT - 1):
+        for x in range(WIDTH - 1):
+            cells = [(y + dy)*WIDTH + x + dx for dy in (0, 1) for dx in (0, 1)]
+            keys |= fill_keys(sum(GOAL << (BITS * i) for i in cells),
+                              sum(1 << i for i in cells), counts)
+    return keys
+
+def goal_distances(counts):
+    '''Breadth first search back from all of the goal boards with the given
+    pieces. Moves can be undone, so the successors of a board are also its
+    predecessors. Return a dict of canonical key to distance to the goal.'''
+    frontier = sorted(goal_keys(counts))
+    distances = dict.fromkeys(frontier, 0)
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for key in frontier:
+            for successor in canonical_successors(key):
+                if successor not in distances:
+                    distances[successor] = depth
+                    next_frontier.append(successor)
+        frontier = next_frontier
+    return distances
+
+def build_distance_db(counts, filename, vectorized=False):
+    '''Compute the goal distances of every board with the given pieces and
+    write them to a database file. Return the number of boards stored. With
+    vectorized, the distances are found with vector_goal_distances (NumPy).
+    The file does not say which board it is for: only the classic board
+    is supported.'''
+    if SPEC != CLASSIC:
+        raise ValueError("distance databases are only built for the classic board")
+    if vectorized:
+        sorted_keys, distances = vector_goal_distances(counts)
+        if len(distances) and distances.max() > 255:
+            raise ValueError('distances do not fit in a byte')
+        keys = array('Q', sorted_keys.tobytes())
+        dists = array('B', distances.astype(np.uint8).tobytes())
+    else:
+        distances = goal_distances(counts)
+        keys = array('Q', sorted(distances))
+        if max(distances.values(), default=0) > 255:
+            raise ValueError('distances do not fit in a byte')
+        dists = array('B', (distances[key] for key in keys))
+
+    db_file = open(filename, "wb")
+    db_file.write(DB_HEADER.pack(DB_MAGIC, len(keys), *counts))
+    write_little_endian(db_file, keys)
+    dists.tofile(db_file)
+    db_file.close()
+    return len(keys)
+
+class DistanceDB:
+    """
+    A goal distance database file (see build_distance_db), memory mapped.
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: The name of the database file.
+        :type filename: str
+        """
+
+        self.filename = filename
+        db_file = open(filename, "rb")
+        self.mmap = mmap.mmap(db_file.fileno(), 0, access=mmap.ACCESS_READ)
+        db_file.close()
+        magic, count, *counts = DB_HEADER.unpack_from(self.mmap)
+        if magic != DB_MAGIC:
+            raise ValueError('{} is not a distance database'.format(filename))
+        self.counts = tuple(counts)
+        self.count = count
+        view = memoryview(self.mmap)
+        start = DB_HEADER.size
+        self.keys = read_little_endian(view[start:start + 8*count], 'Q')
+        self.dists = view[start + 8*count:start + 9*count]
+
+    def covers(self, key):
+        '''Return True iff the board has the pieces this database was built for.'''
+        return SPEC == CLASSIC and piece_counts(key) == self.counts
+
+    def distance(self, key):
+        '''Return the number of moves from a board to the goal, or None if no
+        goal board can be reached from it.'''
+        key = canonical_key(key)
+        i = bisect_left(self.keys, key)
+        if i < self.count and self.keys[i] == key:
+            return self.dists[i]
+        return None
+
+    def heuristic(self, key):
+        '''The distance as a (perfect) heuristic for astar. Boards that cannot
+        reach the goal get an f value that puts them behind every other board.'''
+        d = self.distance(key)
+        return CELLS * 255 if d is None else d
+
+def lookup(initial_state, db, stats=None):
+    '''Given an initial state, follow the goal distances of a database down
+    to a goal, taking one successor that is one move closer at each step.
+    Return the goal state, or None if the goal cannot be reached.'''
+    if stats is None:
+        stats = SearchStats()
+    state = search_root(initial_state)
+    d = db.distance(state.key)
+    if d is None:
+        return None
+    while d > 0:
+        d -= 1
+        stats.expanded += 1
+        for key in canonical_successors(state.key):
+            stats.generated += 1
+            if db.distance(key) == d:
+                state = State(key, state.depth + 1 + d, state.depth + 1,
+                              parent=state)
+                break
+    return state
+
+def path_to_goal_state(keys):
+    '''Given a path of keys from the search root to a goal, return the goal
+    state, linked back to a root state through the parents.'''
+    state = None
+    for depth, key in enumerate(keys):
+        state = State(key, len(keys) - 1, depth, parent=state)
+    return state
+
+def bidirectional(initial_state, stats=None):
+    '''Given an initial state, return the goal state of an optimal solution
+    found by breadth first search forward from the initial board and backward
+    from every goal board with the same pieces at once. The side with the
+    smaller frontier is expanded by a whole layer at a time, and the search
+    stops at the first layer where the two sides meet.'''
+    if stats is None:
+        stats = SearchStats()
+    root = search_root(initial_state)
+    goals = goal_keys(piece_counts(root.key))
+    if root.key in goals:
+        return root
+
+    # (key of the parent, depth) of every key seen from each side. The parent
+    # of a backward key is the next key on the way to the goal.
+    seen = [{root.key: (None, 0)}, dict.fromkeys(goals, (None, 0))]
+    frontiers = [[root.key], list(goals)]
+    depths = [0, 0]
+    successors = stats.timer('successors', canonical_successors)
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        this_seen, other_seen = seen[side], seen[1 - side]
+        depths[side] += 1
+        depth = depths[side]
+        best = None  # (length, meeting key)
+        next_frontier = []
+        for key in frontiers[side]:
+            stats.expanded += 1
+            for successor in successors(key):
+                stats.generated += 1
+                if successor in this_seen:
+                    stats.duplicates += 1
+                    continue
+                this_seen[successor] = (key, depth)
+                next_frontier.append(successor)
+                if successor in other_seen:
+                    length = depth + other_seen[successor][1]
+                    if best is None or length < best[0]:
+                        best = (length, successor)
+        frontiers[side] = next_frontier
+        stats.max_frontier = max(stats.max_frontier,
+                                 len(frontiers[0]) + len(frontiers[1]))
+        if best is not None:
+            forward = []
+            key = best[1]
+            while key is not None:
+                forward.append(key)
+                key = seen[0][key][0]
+            forward.reverse()
+            key = seen[1][best[1]][0]
+            while key is not None:
+                forward.append(key)
+                key = seen[1][key][0]
+            return stats.timer('path', path_to_goal_state)(forward)
+    return None
+
+##############################################################################
+################  CONNECTED COMPONENTS: ######################################
+##############################################################################
+
+# A component index splits every canonical board with one set of pieces into
+# its connected components (the boards reachable from each other) and marks
+# the components that hold a goal board, so that a board that cannot reach
+# the goal is found without searching. The file is laid out like a distance
+# database: a header, the sorted keys (8 bytes each), the component of each
+# key (4 bytes each) and a flag for each component (1 byte each).
+INDEX_MAGIC = b'HRDCC001'
+# magic, count, 1x1s, horizontals, verticals, components
+INDEX_HEADER = struct.Struct('<8sIBBBxI')
+
+def label_components(counts):
+    '''Label the connected components of the boards with the given pieces.
+    Return a dict of canonical key to component number, and a list with
+    True for each component that holds a goal board.'''
+    components = {}
+    solvable = []
+    for key in sorted(all_keys(counts)):
+        if key in components:
+            continue
+        label = len(solvable)
+        components[key] = label
+        frontier = [key]
+        goal = False
+        while frontier:
+            key = frontier.pop()
+            goal = goal or is_goal_key(key)
+            for successor in canonical_successors(key):
+                if successor not in components:
+                    components[successor] = label
+                    frontier.append(successor)
+        solvable.append(goal)
+    return components, solvable
+
+def build_component_index(counts, filename):
+    '''Label the components of the boards with the given pieces and write
+    them to an index file. Return (number of boards, number of components).
+    Like the distance databases, only the classic board is supported.'''
+    if SPEC != CLASSIC:
+        raise ValueError("component indexes are only built for the classic board")
+    components, solvable = label_components(counts)
+    keys = array('Q', sorted(components))
+    labels = array('I', (components[key] for key in keys))
+    flags = array('B', solvable)
+
+    index_file = open(filename, "wb")
+    index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, len(keys), *counts, len(flags)))
+    write_little_endian(index_file, keys)
+    write_little_endian(index_file, labels)
+    flags.tofile(index_file)
+    index_file.close()
+    return len(keys), len(flags)
+
+class ComponentIndex:
+    """
+    A component index file (see build_component_index), memory mapped.
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: The name of the index file.
+        :type filename: str
+        """
+
+        self.filename = filename
+        index_file = open(filename, "rb")
+        self.mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        index_file.close()
+        magic, count, *counts, components = INDEX_HEADER.unpack_from(self.mmap)
+        if magic != INDEX_MAGIC:
+            raise ValueError('{} is not a component index'.format(filename))
+        self.counts = tuple(counts)
+        self.count = count
+        view = memoryview(self.mmap)
+        start = INDEX_HEADER.size
+        self.keys = read_little_endian(view[start:start + 8*count], 'Q')
+        self.labels = read_little_endian(view[start + 8*count:start + 12*count], 'I')
+        self.flags = view[start + 12*count:start + 12*count + components]
+
+    def covers(self, key):
+        '''Return True iff the board has the pieces this index was built for.'''
+        return SPEC == CLASSIC and piece_counts(key) == self.counts
+
+    def component(self, key):
+        '''Return the number of the component of a board, or None if the
+        board is not in the index.'''
+        key = canonical_key(key)
+        i = bisect_left(self.keys, key)
+        if i < self.count and self.keys[i] == key:
+            return self.labels[i]
+        return None
+
+    def solvable(self, key):
+        '''Return True iff a goal board can be reached from a board.'''
+        label = self.component(key)
+        if label is None:
+            raise ValueError("the component index was built for other pieces")
+        return bool(self.flags[label])
+
+##############################################################################
+################  HEURISTICS: ################################################
+##############################################################################
+
+# All of the heuristics are admissible (never more than the real number of
+# moves left), so astar still finds optimal solutions with any of them.
+
+GOAL_ROWS_SHIFT = BITS * GOAL_CELLS[0] # the top two goal cells ...
+GOAL_ROWS_GAP = BITS * WIDTH # ... and the bottom two, a row below
+PAIR_MASK = (1 << (2 * BITS)) - 1
+
+def count_blocking(cells):
+    '''Given the codes of the goal cells ([3][1], [3][2], [4][1], [4][2] on
+    the classic board), return the number of pieces other than the 2x2
+    piece on them.'''
+    top_l, top_r, bottom_l, bottom_r = cells
+    count = sum(1 for code in cells if code not in (EMPTY, GOAL))
+    # pieces that cover two of the goal cells
+    count -= (top_l, top_r) == (LEFT, RIGHT)
+    count -= (bottom_l, bottom_r) == (LEFT, RIGHT)
+    count -= (top_l, bottom_l) == (TOP, BOTTOM)
+    count -= (top_r, bottom_r) == (TOP, BOTTOM)
+    return count
+
+# The number of blocking pieces keyed on the bits of the four goal cells,
+# the top two in the low bits and the bottom two in the high bits
+BLOCKING = tuple(
+    count_blocking([(bits >> (BITS * i)) & CELL_MASK for i in range(4)])
+    for bits in range(1 << (4 * BITS)))
+
+def blocking_heuristic(key):
+    '''The Manhattan distance of the 2x2 piece plus one for every other piece
+    on the cells the 2x2 piece ends up on. Each of these pieces has to move at
+    least once to make way, and that move does not move the 2x2 piece.'''
+    goal_rows = key >> GOAL_ROWS_SHIFT
+    bits = (goal_rows & PAIR_MASK) | ((goal_rows >> GOAL_ROWS_GAP) & PAIR_MASK) << (2 * BITS)
+    return heuristic_key(key) + BLOCKING[bits]
+
+def pattern_successors(key, moves):
+    '''Yield the keys one move away from a board with any number of empty
+    cells, making only the given moves (see shape_moves).'''
+    for mask, value, delta, _, _, entering in moves:
+        if key & mask == value and not key & entering:
+            yield key ^ delta
+
+class PatternDB:
+    """
+    Additive pattern database. The pieces are split into three patterns:
+    the 2x2 piece with the vertical pieces, the horizontal pieces, and the
+    1x1 pieces. For each pattern, every other piece is taken off the board
+    and the moves of the pattern's pieces needed to reach a goal are counted
+    with a search back from the goal boards. The 2x2 piece moves for free in
+    the last two patterns, so every move is counted by one pattern at most and
+    the sum of the three counts is admissible.
+    """
+
+    def __init__(self, counts):
+        """
+        :param counts: The number of (1x1, horizontal, vertical) pieces.
+        :type counts: Tuple[int, int, int]
+        """
+
+        singles, horizontals, verticals = counts
+        self.vertical = self.build((0, 0, verticals), 3, 1)
+        self.horizontal = self.build((0, horizontals, 0), 2, 0)
+        self.single = self.build((singles, 0, 0), 1, 0)
+
+    @staticmethod
+    def build(counts, shape, goal_cost):
+        '''Return the dict of canonical key to number of counted moves to a goal,
+        for the boards holding the 2x2 piece and counts pieces of SHAPES[shape].
+        Moves of the 2x2 piece cost goal_cost (0 or 1).'''
+        goal_moves = shape_moves(SHAPES[0])
+        other_moves = shape_moves(SHAPES[shape])
+        distances = dict.fromkeys(goal_keys(counts), 0)
+        queue = deque(distances)
+        while queue:  # 0-1 breadth first search
+            key = queue.popleft()
+            d = distances[key]
+            for cost, moves in ((goal_cost, goal_moves), (1, other_moves)):
+                for successor in pattern_successors(key, moves):
+                    successor = canonical_key(successor)
+                    if d + cost < distances.get(successor, d + cost + 1):
+                        distances[successor] = d + cost
+                        if cost:
+                            queue.append(successor)
+                        else:
+                            queue.appendleft(successor)
+        return distances
+
+    def heuristic(self, key):
+        '''Sum of the counts of the three patterns of a board.'''
+        goal = cells_with_code(key, GOAL)
+        vertical = goal | cells_with_code(key, TOP) | cells_with_code(key, BOTTOM)
+        horizontal = goal | cells_with_code(key, LEFT) | cells_with_code(key, RIGHT)
+        single = goal | cells_with_code(key, SINGLE)
+        return (self.vertical[canonical_key(key & vertical * CELL_MASK)]
+                + self.horizontal[canonical_key(key & horizontal * CELL_MASK)]
+                + self.single[canonical_key(key & single * CELL_MASK)])
+
+# The heuristics that can be picked with --heuristic. Each entry makes the
+# heuristic on keys for searches from the given key, with the distance
+# database db if one was given (see DistanceDB).
+HEURISTICS = {
+    'manhattan': lambda key, db: heuristic_key,
+    'blocking': lambda key, db: blocking_heuristic,
+    'pdb': lambda key, db: PatternDB(piece_counts(key)).heuristic,
+    'db': lambda key, db: db.heuristic,
+}
+
+def compare_heuristics(initial_state, db=None):
+    '''Run astar with each heuristic and return a list of (name, moves,
+    expanded, generated, seconds) rows. The time includes building the
+    heuristic's tables.'''
+    rows = []
+    for name, make in HEURISTICS.items():
+        if name == 'db' and db is None:
+            continue
+        stats = SearchStats()
+        time1 = time.time()
+        goal_state = astar(initial_state, make(initial_state.key, db), stats)
+        rows.append((name, goal_state.depth if goal_state else None,
+                     stats.expanded, stats.generated, time.time() - time1))
+    return rows
+
+##############################################################################
+################  MEMORY-BOUNDED SEARCH: #####################################
+##############################################################################
+
+# Rough number of bytes taken by one transposition table entry of idastar
+# and by one node of smastar, used to turn a memory limit into a count.
+TABLE_ENTRY_BYTES = 200
+SMA_NODE_BYTES = 600
+
+def idastar(initial_state, h=heuristic_key, max_entries=None, stats=None):
+    '''Given an initial state, return the goal state of an optimal solution
+    found by iterative deepening A*: depth first searches that cut off at
+    states with f above a bound, raising the bound to the least f that was
+    cut off until a goal is found. Only the current path is kept, plus a
+    transposition table of at most max_entries keys (see ida_search).
+
+    Return None once nothing is left to search: when nothing was cut off,
+    or when every board in the table has been expanded and none was ever
+    evicted from it, so all the boards that can be reached were searched.
+    If the table is too small for that, a board with no solution is
+    searched until it runs out of time.'''
+    if stats is None:
+        stats = SearchStats()
+    if max_entries is None:
+        max_entries = math.inf
+    root = search_root(initial_state)
+    path = [root.key]
+    bound = h(root.key)
+    table = {}
+    iteration = 0
+    size = 0
+    evicted = stats.evicted
+    h = stats.timer('heuristic', h)
+    successors = stats.timer('successors', canonical_successors)
+    while bound < math.inf:
+        iteration += 1
+        table[root.key] = [iteration, 0, bound, math.inf]
+        found, bound = ida_search(path, bound, iteration, h, table,
+                                  max_entries, stats, successors)
+        if found:
+            return stats.timer('path', path_to_goal_state)(path)
+        # only look at the whole table once it stops growing
+        if (len(table) == size and stats.evicted == evicted and
+                all(entry[3] for entry in table.values())):
+            return None
+        size = len(table)
+    return None
+
+def ida_search(path, bound, iteration, h, table, max_entries, stats,
+               successors=canonical_successors):
+    '''The depth first search of one iteration of idastar from the last key on
+    path. Return (True, f) with the goal at the end of path if one is found
+    within the bound, else (False, least f above the bound).
+
+    The table maps a key to [iteration, depth, h, work]: the last iteration
+    it was searched in, the least depth it was reached at in that iteration,
+    the best lower bound on its moves to the goal learned so far (the least
+    f cut off below it, minus its depth), and the most states expanded below
+    it in one search (0 if it was only ever cut off). A key reached again in
+    the same iteration at no less depth is skipped, and the learned h cuts
+    off subtrees early in later iterations. When the table is full, the
+    entries that saved the least work are evicted (see evict_entries).'''
+    key = path[-1]
+    if is_goal_key(key):
+        return True, len(path) - 1
+    stats.expanded += 1
+    least = math.inf
+    depth = len(path)
+    if depth > stats.max_frontier: # the frontier of IDA* is the path
+        stats.max_frontier = depth
+    for successor in successors(key):
+        stats.generated += 1
+        entry = table.get(successor)
+        if entry is None:
+            successor_h = h(successor)
+        elif entry[0] == iteration and entry[1] <= depth:
+            stats.duplicates += 1
+            continue  # already searched from here with as much of the bound left
+        else:
+            successor_h = entry[2]
+        f = depth + successor_h
+        work = stats.expanded
+        if f <= bound:
+            path.append(successor)
+            found, f = ida_search(path, bound, iteration, h, table,
+                                  max_entries, stats, successors)
+            if found:
+                return True, f
+            path.pop()
+        work = stats.expanded - work
+        if f < least:
+            least = f
+        if entry is not None:
+            entry[0], entry[1], entry[2] = iteration, depth, max(successor_h, f - depth)
+            if work > entry[3]:
+                entry[3] = work
+        else:
+            if len(table) >= max_entries:
+                evict_entries(table, stats)
+            table[successor] = [iteration, depth, max(successor_h, f - depth), work]
+    return False, least
+
+def evict_entries(table, stats):
+    '''Make room in a full idastar table by dropping the quarter of its
+    entries with the least work below them (see ida_search). Those are the
+    boards that were only cut off and the ones far down the search, which
+    cost little to search again, while keeping the others stops the search
+    from going over the same boards again and again.'''
+    count = max(1, len(table) // 4)
+    for key in sorted(table, key=lambda key: table[key][3])[:count]:
+        del table[key]
+    stats.evicted += count
+
+class SMANode(State):
+    """
+    A state of smastar, which also keeps track of its children in memory and
+    of the best f value of each of its children that were forgotten.
+    """
+
+    def __init__(self, key, f, depth, parent=None):
+        super().__init__(key, f, depth, parent)
+        self.children = 0  # number of children in memory
+        self.forgotten = {}  # key of forgotten child -> its f value
+        self.expanded = False
+        self.alive = True
+        self.version = 0  # bumped whenever the node is queued again
+
+    def priority(self):
+        '''The f value the node is queued with: its own if it was never
+        expanded, else the best f of its forgotten children.'''
+        if not self.expanded:
+            return self.f
+        return min(self.forgotten.values(), default=math.inf)
+
+def smastar(initial_state, h=heuristic_key, max_nodes=None, stats=None):
+    '''Given an initial state, return the goal state of an optimal solution
+    found by simplified memory-bounded A* (SMA*), keeping at most max_nodes
+    nodes. When memory is full, the leaf with the highest f (and the least
+    depth on ties) is forgotten, and its parent remembers its f value so the
+    subtree is generated again once its parent is the best node left. Return
+    None if there is no solution that fits in max_nodes.'''
+    if stats is None:
+        stats = SearchStats()
+    if max_nodes is None:
+        max_nodes = math.inf
+    root = search_root(initial_state)
+    root = SMANode(root.key, root.f, 0)
+    best = {root.key: root}  # key -> node in memory with the least depth
+    frontier = []  # best node first, deepest on ties
+    leaves = []  # worst leaf first, shallowest on ties
+    size = 1
+    successors_of = stats.timer('successors', canonical_successors)
+    h = stats.timer('heuristic', h)
+    push = stats.timer('frontier', heappush)
+    pop = stats.timer('frontier', heappop)
+
+    def queue(node):
+        node.version += 1
+        f = node.priority()
+        if not node.expanded or node.forgotten:
+            push(frontier, (f, -node.depth, node.id, node.version, node))
+        if node.children == 0:
+            push(leaves, (-f, node.depth, node.id, node.version, node))
+
+    queue(root)
+    while frontier:
+        f, _, _, version, node = pop(frontier)
+        if not node.alive or version != node.version:
+            continue
+        if f == math.inf:
+            return None
+        if is_goal_key(node.key):
+            return node
+
+        stats.expanded += 1
+        depth = node.depth + 1
+        if node.expanded: # only make the forgotten children again
+            successors = [key for key in successors_of(node.key)
+                          if key in node.forgotten]
+        else:
+            successors = successors_of(node.key)
+            node.expanded = True
+        for key in successors:
+            stats.generated += 1
+            child_f = max(node.f, depth + h(key), node.forgotten.pop(key, 0))
+            other = best.get(key)
+            if other is not None and other.alive and other.depth <= depth:
+                stats.duplicates += 1
+                continue
+            if depth >= max_nodes - 1 and not is_goal_key(key):
+                child_f = math.inf  # no room for a path through this child
+            child = SMANode(key, child_f, depth, parent=node)
+            best[key] = child
+            node.children += 1
+            size += 1
+            queue(child)
+        node.forgotten.clear() # the rest are duplicates of nodes in memory
+        queue(node)
+        if size > stats.max_frontier: # the nodes in memory
+            stats.max_frontier = size
+
+        while size > max_nodes and leaves:
+            _, _, _, version, leaf = pop(leaves)
+            if not leaf.alive or version != leaf.version or leaf.parent is None:
+                continue
+            leaf.alive = False
+            size -= 1
+            if best.get(leaf.key) is leaf:
+                del best[leaf.key]
+            parent = leaf.parent
+            parent.children -= 1
+            parent.forgotten[leaf.key] = min(parent.forgotten.get(leaf.key, math.inf),
+                                             leaf.priority())
+            queue(parent)
+
+        # drop the entries of forgotten and requeued nodes once they pile up
+        if len(frontier) + len(leaves) > 4 * size + 64:
+            frontier = [entry for entry in frontier
+                        if entry[4].alive and entry[3] == entry[4].version]
+            leaves = [entry for entry in leaves
+                      if entry[4].alive and entry[3] == entry[4].version]
+            heapify(frontier)
+            heapify(leaves)
+    return None
+
+##############################################################################
+################  VECTORIZED SEARCH: #########################################
+##############################################################################
+
+# The vectorized breadth first search holds a whole layer of boards as a
+# sorted NumPy array of canonical keys and makes every move on all of them at
+# once. NumPy is optional: only npbfs and build-db --numpy need it, and it
+# is imported the first time they run.
+np = None
+vector_tables = None # (moves by empty cells pattern, MIRROR_ROW) as arrays
+
+def get_vector_tables():
+    '''Return the move and mirror tables as NumPy arrays, building them the
+    first time. The moves are (masks, values, deltas), each of shape
+    (CELLS*CELLS, slots): row b1*CELLS + b2 holds the moves of MOVES for the
+    empty cells b1 < b2, padded with moves that never apply. Raise an
+    ImportError without NumPy.'''
+    global np, vector_tables
+    if vector_tables is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("the vectorized search needs NumPy "
+                              "(pip install numpy)") from None
+        np = numpy
+        slots = max(len(moves) for moves in MOVES.values())
+        masks = np.zeros((CELLS * CELLS, slots), dtype=np.uint64)
+        values = np.ones((CELLS * CELLS, slots), dtype=np.uint64) # never matched
+        deltas = np.zeros((CELLS * CELLS, slots), dtype=np.uint64)
+        for empty, moves in MOVES.items():
+            low = empty & -empty
+            row = ((low.bit_length() - 1) // BITS * CELLS +
+                   ((empty ^ low).bit_length() - 1) // BITS)
+            for slot, (mask, value, delta, _, _) in enumerate(moves):
+                masks[row, slot] = mask
+                values[row, slot] = value
+                deltas[row, slot] = delta
+        vector_tables = ((masks, values, deltas),
+                         np.array(MIRROR_ROW, dtype=np.uint64))
+    return vector_tables
+
+def vector_canonical(keys):
+    '''canonical_key of every key of an array.'''
+    mirror_row = get_vector_tables()[1]
+    mirrored = np.zeros_like(keys)
+    for shift in ROW_SHIFTS:
+        shift = np.uint64(shift)
+        mirrored |= mirror_row[(keys >> shift) & np.uint64(ROW_MASK)] << shift
+    return np.minimum(keys, mirrored)
+
+def vector_successors(keys):
+    '''canonical_successors of every key of an array, all in one array.'''
+    (masks, values, deltas), _ = get_vector_tables()
+    x = keys # cells_with_code(key, EMPTY)
+    empty = ~(x | (x >> np.uint64(1)) | (x >> np.uint64(2))) & np.uint64(LOW_BITS)
+    low = empty & (~empty + np.uint64(1))
+    rows = ((np.log2(low.astype(np.float64)).astype(np.int64) // BITS) * CELLS +
+            np.log2((empty ^ low).astype(np.float64)).astype(np.int64) // BITS)
+    column = keys[:, None]
+    legal = (column & masks[rows]) == values[rows]
+    return vector_canonical((column ^ deltas[rows])[legal])
+
+def vector_member(sorted_keys, keys):
+    '''Return a boolean array telling which keys are in a sorted array.'''
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    i = np.searchsorted(sorted_keys, keys)
+    return sorted_keys[np.minimum(i, len(sorted_keys) - 1)] == keys
+
+def vector_layers(roots, stats=None):
+    """
+    Breadth first search from some boards, a layer at a time. Moves can be
+    undone, so the boards next to a layer are all in the layer before it, in
+    the layer itself or new: only those two layers are needed to drop the
+    boards seen before.
+
+    :param roots: The canonical keys of the boards to start from.
+    :type roots: Iterable[int]
+    :param stats: Where the work done is counted.
+    :type stats: Optional[SearchStats]
+    :return: The sorted array of canonical keys of each layer, starting
+        with the roots
+    :rtype: Iterator[numpy.ndarray]
+    """
+
+    if stats is None:
+        stats = SearchStats()
+    get_vector_tables() # fails early without NumPy
+    before = np.zeros(0, dtype=np.uint64)
+    layer = np.unique(np.array(list(roots), dtype=np.uint64))
+    while len(layer):
+        yield layer
+        stats.expanded += len(layer)
+        successors = vector_successors(layer)
+        generated = len(successors)
+        successors = np.unique(successors)
+        new = successors[~(vector_member(layer, successors) |
+                           vector_member(before, successors))]
+        stats.generated += generated
+        stats.duplicates += generated - len(new)
+        if len(new) > stats.max_frontier:
+            stats.max_frontier = len(new)
+        before, layer = layer, new
+
+def npbfs(initial_state, stats=None):
+    '''Given an initial state, return the goal state of an optimal solution
+    found by the vectorized breadth first search (see vector_layers). The
+    path is found back from the goal: a board of each layer next to the
+    board found in the layer after it. Raise an ImportError without NumPy.'''
+    get_vector_tables() # imports NumPy
+    layers = []
+    goal_value = np.uint64(GOAL_VALUE)
+    goal_mask = np.uint64(GOAL_MASK)
+    for layer in vector_layers([search_root(initial_state).key], stats):
+        layers.append(layer)
+        goals = layer[(layer & goal_mask) == goal_value]
+        if len(goals):
+            path = [int(goals[0])]
+            for before in reversed(layers[:-1]):
+                for key in canonical_successors(path[-1]):
+                    if vector_member(before, np.array([key], dtype=np.uint64))[0]:
+                        path.append(key)
+                        break
+            path.reverse()
+            return path_to_goal_state(path)
+    return None
+
+def vector_goal_distances(counts):
+    '''goal_distances with the vectorized breadth first search. Return the
+    sorted array of keys and the array of their distances.'''
+    layers = list(vector_layers(goal_keys(counts)))
+    keys = np.concatenate(layers)
+    dists = np.concatenate([np.full(len(layer), depth, dtype=np.int64)
+                            for depth, layer in enumerate(layers)])
+    order = np.argsort(keys)
+    return keys[order], dists[order]
+
+##############################################################################
+################  EXTERNAL-MEMORY SEARCH: ####################################
+##############################################################################
+
+# Breadth first search with delayed duplicate detection: the layers of boards
+# live on disk as files of sorted canonical keys (see WORD_MASK), and so do the
+# successors of the layer being expanded, spilled as sorted segments whenever
+# the buffer in memory fills up. The segments are merged into the next layer,
+# dropping the boards of the two layers before it (moves can be undone, so no
+# older board can come back). Files are read through small memory mapped
+# windows, so the memory used stays about the same however large the layers get.
+SPILL_ENTRY_BYTES = 100 # rough bytes per key in the buffer (list slot, int, sort)
+SPILL_ENTRIES = 1 << 20 # keys buffered before spilling without a memory limit
+SPILL_WINDOW = 16 * mmap.ALLOCATIONGRANULARITY # bytes of a file mapped at once
+MERGE_WAYS = 64 # most segments merged at once
+
+# Each key takes KEY_WORDS 64 bit words in the files, the most significant
+# first, so that the files sort the same way as the keys.
+WORD_MASK = (1 << 64) - 1
+
+def record_key(words, i):
+    '''Return key i of an array of KEY_WORDS words per key.'''
+    if KEY_WORDS == 1:
+        return words[i]
+    key = 0
+    for word in words[i * KEY_WORDS:(i + 1) * KEY_WORDS]:
+        key = key << 64 | word
+    return key
+
+def write_segment(filename, keys):
+    '''Write sorted keys to a file, dropping repeats. Return the number of
+    keys written.'''
+    count = 0
+    last = None
+    out = array('Q')
+    shifts = [64 * i for i in reversed(range(KEY_WORDS))]
+    with open(filename, "wb") as f:
+        for key in keys:
+            if key != last:
+                if KEY_WORDS == 1:
+                    out.append(key)
+                else:
+                    out.extend((key >> shift) & WORD_MASK for shift in shifts)
+                last = key
+                if len(out) * 8 >= SPILL_WINDOW:
+                    out.tofile(f)
+                    count += len(out)
+                    del out[:]
+        out.tofile(f)
+    return (count + len(out)) // KEY_WORDS
+
+def read_segment(filename):
+    '''Yield the keys of a file written by write_segment, one window of it
+    mapped at a time.'''
+    window_bytes = SPILL_WINDOW * KEY_WORDS # a whole number of keys
+    with open(filename, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        for offset in range(0, size, window_bytes):
+            words = array('Q')
+            with mmap.mmap(f.fileno(), min(window_bytes, size - offset),
+                           access=mmap.ACCESS_READ, offset=offset) as window:
+                words.frombytes(window)
+            if KEY_WORDS == 1:
+                yield from words
+            else:
+                for i in range(len(words) // KEY_WORDS):
+                    yield record_key(words, i)
+
+def segment_contains(filename, key):
+    '''Return True iff a file written by write_segment holds a key.'''
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as whole:
+            words = memoryview(whole).cast('Q')
+            low, high = 0, len(words) // KEY_WORDS
+            while low < high:
+                middle = (low + high) // 2
+                if record_key(words, middle) < key:
+                    low = middle + 1
+                else:
+                    high = middle
+            found = low < len(words) // KEY_WORDS and record_key(words, low) == key
+            words.release()
+    return found
+
+def sorted_difference(keys, *others):
+    '''Yield the sorted keys that are not in any of the other sorted
+    iterables.'''
+    heads = []
+    for other in others:
+        other = iter(other)
+        heads.append([next(other, None), other])
+    for key in keys:
+        seen = False
+        for head in heads:
+            while head[0] is not None and head[0] < key:
+                head[0] = next(head[1], None)
+            seen = seen or head[0] == key
+        if not seen:
+            yield key
+
+def merge_segments(filenames, filename):
+    '''Merge files written by write_segment, MERGE_WAYS at a time into files
+    named after filename, until at most MERGE_WAYS are left. The files merged
+    are deleted. Return the names of the files left.'''
+    level = 0
+    while len(filenames) > MERGE_WAYS:
+        merged = []
+        for i in range(0, len(filenames), MERGE_WAYS):
+            group = filenames[i:i + MERGE_WAYS]
+            merged.append('{}.{}.{}'.format(filename, level, len(merged)))
+            write_segment(merged[-1], merge(*map(read_segment, group)))
+            for name in group:
+                os.remove(name)
+        filenames = merged
+        level += 1
+    return filenames
+
+def ddbfs(initial_state, stats=None, max_entries=None, directory=None):
+    """
+    Breadth first search with delayed duplicate detection and its tables on
+    disk (see above).
+
+    :param initial_state: The state to start from.
+    :type initial_state: State
+    :param stats: Where the work done is counted. stats.disk_bytes is set to
+        the most bytes the files took at once.
+    :type stats: Optional[SearchStats]
+    :param max_entries: The most successor keys held in memory before they
+        are spilled to disk (default: SPILL_ENTRIES).
+    :type max_entries: Optional[int]
+    :param directory: Where the files are made, in a directory of their own
+        that is removed at the end (default: the system temporary directory).
+    :type directory: Optional[str]
+    :return: The goal state of an optimal solution, or None if the goal
+        cannot be reached.
+    :rtype: Optional[State]
+    """
+
+    if stats is None:
+        stats = SearchStats()
+    if max_entries is None:
+        max_entries = SPILL_ENTRIES
+    max_entries = max(max_entries, 1)
+    successors = stats.timer('successors', canonical_successors)
+    with tempfile.TemporaryDirectory(prefix='hrd-', dir=directory) as tmp:
+        layers = [os.path.join(tmp, 'layer0')]
+        write_segment(layers[0], [search_root(initial_state).key])
+        sizes = [1]
+        while sizes[-1]:
+            # expand the last layer, spilling its successors in sorted segments
+            segments = []
+            buffer = []
+            goal = None
+            for key in read_segment(layers[-1]):
+                if is_goal_key(key):
+                    goal = key
+                    break
+                stats.expanded += 1
+                buffer.extend(successors(key))
+                if len(buffer) >= max_entries:
+                    stats.generated += len(buffer)
+                    buffer.sort()
+                    segments.append(os.path.join(tmp, 'segment{}'.format(len(segments))))
+                    write_segment(segments[-1], buffer)
+                    buffer = []
+            if goal is not None:
+                break
+            stats.generated += len(buffer)
+            buffer.sort()
+            segments.append(os.path.join(tmp, 'segment{}'.format(len(segments))))
+            write_segment(segments[-1], buffer)
+            buffer = None
+            disk_bytes = 8 * KEY_WORDS * sum(sizes) + sum(os.path.getsize(name)
+                                              for name in segments)
+            stats.disk_bytes = max(stats.disk_bytes, disk_bytes)
+
+            # merge the segments into the next layer, without older boards
+            segments = merge_segments(segments, os.path.join(tmp, 'merge'))
+            layers.append(os.path.join(tmp, 'layer{}'.format(len(layers))))
+            new = merge(*map(read_segment, segments))
+            sizes.append(write_segment(layers[-1], sorted_difference(
+                new, *map(read_segment, layers[-3:-1]))))
+            for name in segments:
+                os.remove(name)
+            stats.max_frontier = max(stats.max_frontier, sizes[-1])
+        stats.duplicates = stats.generated - (sum(sizes) - 1)
+        if goal is None:
+            return None
+
+        # find the path back from the goal: a board of each layer next to the
+        # board found in the layer after it
+        path = [goal]
+        for layer in reversed(layers[:-1]):
+            for key in canonical_successors(path[-1]):
+                if segment_contains(layer, key):
+                    path.append(key)
+                    break
+        path.reverse()
+        return stats.timer('path', path_to_goal_state)(path)
+
+##############################################################################
+################  BOUNDED-SUBOPTIMAL SEARCH: #################################
+##############################################################################
+
+DEFAULT_WEIGHT = 2.0 # the weight of wastar and the first weight of arastar
+ARA_STEP = 0.25 # how much arastar lowers the weight after each search
+
+def arastar(initial_state, h=heuristic_key, weights=(1.0,), stats=None,
+            deadline=None, max_expanded=None):
+    """
+    Anytime repairing A* (ARA*): a weighted A* search (f = g + weight * h)
+    for each weight in turn, reusing the work of the searches before it.
+    States whose g value gets lower after they were expanded are set aside
+    and only searched again by the next search, so each search expands a
+    state at most once. A weight of math.inf orders the states by h alone
+    (greedy best first search).
+
+    After each search that finds a better solution, yield it with its
+    bound: its number of moves is at most bound times the least number of
+    moves. The bound is the least of the weight and the moves over the
+    least g + h of the states not searched yet, which is a lower bound on
+    the least number of moves since h is admissible.
+
+    :param initial_state: The state to start from.
+    :type initial_state: State
+    :param h: The heuristic on keys.
+    :type h: Callable[[int], int]
+    :param weights: The weights of the searches, from high to low.
+    :type weights: Iterable[float]
+    :param stats: Where the work done is counted.
+    :type stats: Optional[SearchStats]
+    :param deadline: A time.perf_counter() value after which no more states
+        are expanded once a solution is found.
+    :type deadline: Optional[float]
+    :param max_expanded: The number of states expanded after which no more
+        are expanded once a solution is found.
+    :type max_expanded: Optional[int]
+    :return: (goal state, bound) of each better solution
+    :rtype: Iterator[Tuple[State, float]]
+    """
+
+    if stats is None:
+        stats = SearchStats()
+    root = search_root(initial_state).key
+    if is_goal_key(root):
+        yield path_to_goal_state([root]), 1.0
+        return
+    successors = stats.timer('successors', canonical_successors)
+    h = stats.timer('heuristic', h)
+    push = stats.timer('frontier', heappush)
+    pop = stats.timer('frontier', heappop)
+    g = {root: 0}  # least depth each canonical key was reached at
+    hs = {root: h(root)}
+    parents = {root: None}
+    waiting = {root}  # keys on the frontier (it also holds stale entries)
+    inconsistent = set()  # keys reached again at a lower depth after expansion
+    best, goal = math.inf, None  # moves and key of the best goal found
+    reported = (math.inf, math.inf)  # moves and bound of the last yielded
+
+    for weight in weights:
+        if weight == math.inf:
+            def priority(key):
+                return hs[key], -g[key]
+        else:
+            def priority(key):
+                return g[key] + weight * hs[key], -g[key]
+        waiting |= inconsistent
+        inconsistent = set()
+        frontier = [(priority(key), key) for key in waiting]
+        heapify(frontier)
+        closed = set()
+        out_of_budget = False
+        while frontier:
+            if goal is not None:
+                if frontier[0][0] >= priority(goal):
+                    break # no state left can lead to a better solution
+                if (max_expanded is not None and stats.expanded >= max_expanded) or \
+                (deadline is not None and time.perf_counter() >= deadline):
+                    out_of_budget = True
+                    break
+            p, key = pop(frontier)
+            if key not in waiting or p != priority(key):
+                continue # stale entry
+            waiting.discard(key)
+            closed.add(key)
+            if is_goal_key(key):
+                continue
+            stats.expanded += 1
+            depth = g[key] + 1
+            for successor in successors(key):
+                stats.generated += 1
+                if g.get(successor, math.inf) <= depth:
+                    stats.duplicates += 1
+                    continue
+                g[successor] = depth
+                parents[successor] = key
+                if successor not in hs:
+                    hs[successor] = h(successor)
+                if is_goal_key(successor) and depth < best:
+                    best, goal = depth, successor
+                if successor in closed:
+                    inconsistent.add(successor)
+                else:
+                    waiting.add(successor)
+                    push(frontier, (priority(successor), successor))
+            if len(waiting) > stats.max_frontier:
+                stats.max_frontier = len(waiting)
+
+        if goal is None:
+            return # the goal cannot be reached
+        lower = min((g[key] + hs[key] for key in itertools.chain(waiting, inconsistent)),
+                    default=best)
+        bound = max(1.0, min(weight, best / lower if lower else math.inf))
+        if (best, bound) < reported:
+            reported = (best, bound)
+            yield stats.timer('path', path_to_goal_state)(trace_path(parents, goal)), bound
+        if out_of_budget or bound == 1.0:
+            return
+
+def ara_weights(weight):
+    '''The weights of arastar: weight, then ARA_STEP less each time down to 1.'''
+    weights = []
+    while weight > 1:
+        weights.append(weight)
+        weight -= ARA_STEP
+    return weights + [1.0]
+
+def check_key(key):
+    '''Raise a ValueError if a board does not have one 2x2 piece and BLANKS
+    empty cells, the boards all of the searches expect.'''
+    if cells_with_code(key, EMPTY).bit_count() != BLANKS or \
+    cells_with_code(key, GOAL).bit_count() != 4:
+        raise ValueError("the board needs one 2x2 piece and {} empty cells".format(BLANKS))
+
+ALGORITHMS = ['astar', 'dfs', 'lookup', 'bidir', 'idastar', 'smastar', 'hdastar',
+              'wastar', 'arastar', 'greedy', 'npbfs', 'ddbfs']
+
+def solve(initial_state, algo, heuristic=None, db=None, memory_limit=None,
+          stats=None, workers=None, weight=None, time_budget=None,
+          node_budget=None, depth_limit=None, spill_dir=None):
+    """
+    Run one of the search algorithms from an initial state.
+
+    :param initial_state: The state to start from.
+    :type initial_state: State
+    :param algo: The searching algorithm, one of ALGORITHMS.
+    :type algo: str
+    :param heuristic: The heuristic of astar, idastar and smastar (and the
+        move order of dfs), a key of HEURISTICS (default: db if a database is
+        given, manhattan otherwise).
+    :type heuristic: Optional[str]
+    :param db: A goal distance database, needed by lookup and the db heuristic.
+    :type db: Optional[DistanceDB]
+    :param memory_limit: Memory budget in MB of idastar, smastar and ddbfs.
+    :type memory_limit: Optional[float]
+    :param stats: Where the work done is counted.
+    :type stats: Optional[SearchStats]
+    :param workers: The number of worker processes of hdastar.
+    :type workers: Optional[int]
+    :param weight: The weight of wastar and the first weight of arastar
+        (default: DEFAULT_WEIGHT).
+    :type weight: Optional[float]
+    :param time_budget: Seconds after which arastar stops improving its
+        solution.
+    :type time_budget: Optional[float]
+    :param node_budget: States expanded after which arastar stops improving
+        its solution.
+    :type node_budget: Optional[int]
+    :param depth_limit: The most moves dfs searches from the initial board.
+    :type depth_limit: Optional[int]
+    :param spill_dir: Where ddbfs makes its files (default: the system
+        temporary directory).
+    :type spill_dir: Optional[str]
+    :return: The goal state found, or None if the goal cannot be reached.
+        stats.bound is set to the suboptimality bound of the solution, 1 for
+        the optimal algorithms, or left None for dfs.
+    :rtype: Optional[State]
+    """
+
+    if stats is None:
+        stats = SearchStats()
+    check_key(initial_state.key)
+    if heuristic is None:
+        heuristic = 'db' if db else 'manhattan'
+    if weight is None:
+        weight = DEFAULT_WEIGHT
+    if weight < 1:
+        raise ValueError("the weight must be at least 1")
+    if db is None and (algo == 'lookup' or heuristic == 'db'):
+        raise ValueError("lookup and the db heuristic need a distance database")
+    if db is not None and not db.covers(initial_state.key):
+        raise ValueError("the distance database was built for other pieces")
+    budget = None if memory_limit is None else memory_limit * 2**20
+
+    if algo in ('astar', 'dfs', 'idastar', 'smastar', 'wastar', 'arastar', 'greedy'):
+        h = HEURISTICS[heuristic](initial_state.key, db)
+    if algo in ('wastar', 'arastar', 'greedy'):
+        if algo == 'wastar':
+            weights = [weight]
+        elif algo == 'greedy':
+            weights = [math.inf]
+        else:
+            weights = ara_weights(weight)
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        goal_state = None
+        for goal_state, stats.bound in arastar(initial_state, h, weights, stats,
+                                               deadline, node_budget):
+            pass
+        return goal_state
+    if algo == 'astar':
+        goal_state = astar(initial_state, h, stats)
+    elif algo == 'dfs':
+        # the 2x2 piece can make at most one move, and it comes first
+        # already, so ordering the moves by its Manhattan distance does nothing
+        return dfs(initial_state, stats, depth_limit,
+                   None if heuristic == 'manhattan' else h)
+    elif algo == 'lookup':
+        goal_state = lookup(initial_state, db, stats)
+    elif algo == 'bidir':
+        goal_state = bidirectional(initial_state, stats)
+    elif algo == 'idastar':
+        max_entries = None if budget is None else int(budget // TABLE_ENTRY_BYTES)
+        goal_state = idastar(initial_state, h, max_entries, stats)
+    elif algo == 'smastar':
+        max_nodes = None if budget is None else int(budget // SMA_NODE_BYTES)
+        goal_state = smastar(initial_state, h, max_nodes, stats)
+    elif algo == 'hdastar':
+        goal_state = hdastar(initial_state, workers, heuristic, db, stats)
+    elif algo == 'npbfs':
+        if BLANKS != 2 or KEY_WORDS > 1:
+            raise ValueError("npbfs needs two empty cells and keys of 64 bits "
+                             "(at most 21 cells)")
+        try:
+            get_vector_tables()
+        except ImportError as e:
+            raise ValueError(str(e))
+        goal_state = npbfs(initial_state, stats)
+    elif algo == 'ddbfs':
+        max_entries = None if budget is None else int(budget // SPILL_ENTRY_BYTES)
+        goal_state = ddbfs(initial_state, stats, max_entries, spill_dir)
+    else:
+        raise ValueError("unknown algorithm {}".format(algo))
+    if goal_state is not None:
+        stats.bound = 1.0 # all of the heuristics are admissible
+    return goal_state
+
+##############################################################################
+################  PATH SHORTENING: ###########################################
+##############################################################################
+
+# dfs and greedy find a solution fast, but it wanders: the solutions of dfs
+# are thousands of moves long, with long detours between boards a few moves
+# apart, and other solutions can come back to boards they passed before.
+# shorten_path finds the shortest solution among the boards a solution
+# passes through and the boards near them. A board met again is a loop that
+# costs 0 moves to skip, and a small breadth first search around each board
+# finds the later boards (or another goal) it reaches in fewer moves than
+# the solution takes. The work per board is bounded by the radius of the
+# search, so a pass takes time linear in the number of moves.
+
+SHORTCUT_RADIUS = 3 # moves searched around each board for shortcuts
+
+def neighbourhood(key, radius):
+    '''Breadth first search of the boards at most radius moves from a key.
+    Return a dict from each board reached to the board it was reached from
+    (None for key), and the boards reached in 0, 1, ... radius moves.'''
+    parents = {key: None}
+    layers = [[key]]
+    for _ in range(radius):
+        layer = []
+        for key in layers[-1]:
+            for delta in key_moves(key):
+                new_key = key ^ delta
+                if new_key not in parents:
+                    parents[new_key] = key
+                    layer.append(new_key)
+        layers.append(layer)
+    return parents, layers
+
+def shortcut_pass(keys, radius):
+    '''One pass of shorten_path: return the shortest path from keys[0] to a
+    goal that uses the moves of keys and shortcuts of at most radius moves
+    from its boards to later ones (or to another goal).'''
+    end = len(keys) - 1
+    if end == 0:
+        return keys
+    # following[i] is the next position of the board at position i (None if
+    # it is not met again), and upcoming holds the next position of each
+    # board after the current one: a shortcut to a board also reaches the
+    # later times it is met, for 0 moves
+    following = [None] * len(keys)
+    upcoming = {}
+    for i in range(end, -1, -1):
+        following[i] = upcoming.get(keys[i])
+        upcoming[keys[i]] = i
+    # moves[i] is the fewest moves to keys[i] found so far (end + 1 if it
+    # was not reached), and via[i] the (position, moves) of the step it took
+    moves = [0] + [end + 1] * end
+    via = [None] * len(keys)
+    goal = None # (moves, position, moves of the shortcut, key) of another goal
+    for i in range(end):
+        if following[i] is None:
+            del upcoming[keys[i]]
+        else:
+            upcoming[keys[i]] = following[i]
+        if moves[i] > end:
+            continue
+        if moves[i] + 1 < moves[i + 1]:
+            moves[i + 1], via[i + 1] = moves[i] + 1, (i, 1)
+        for depth, layer in enumerate(neighbourhood(keys[i], radius)[1]):
+            for key in layer:
+                j = upcoming.get(key)
+                if j is not None:
+                    if moves[i] + depth < moves[j]:
+                        moves[j], via[j] = moves[i] + depth, (i, depth)
+                elif is_goal_key(key) and \
+                moves[i] + depth < (moves[end] if goal is None else goal[0]):
+                    goal = (moves[i] + depth, i, depth, key)
+
+    # follow the steps back from the goal, searching again for the boards
+    # in the middle of each shortcut
+    if goal is not None and goal[0] < moves[end]:
+        _, i, depth, key = goal
+    else:
+        (i, depth), key = via[end], keys[end]
+    path = [key]
+    while True:
+        if depth > 1:
+            parents = neighbourhood(keys[i], depth)[0]
+            key = parents[path[-1]]
+            while key != keys[i]:
+                path.append(key)
+                key = parents[key]
+        if depth > 0: # after 0 moves keys[i] is the board on the path already
+            path.append(keys[i])
+        if i == 0:
+            break
+        i, depth = via[i]
+    path.reverse()
+    return path
+
+def shorten_path(keys, radius=SHORTCUT_RADIUS):
+    """
+    Make a solution shorter: remove its loops and splice in the shortcuts
+    found by searching up to radius moves around each of its boards (see
+    shortcut_pass). Passes are repeated while they make it shorter, each on
+    the result of the last.
+
+    :param keys: The keys of the boards of a solution, one move apart, from
+        the initial board to a goal.
+    :type keys: List[int]
+    :param radius: The most moves of a shortcut. With 0 only the loops are
+        removed.
+    :type radius: int
+    :return: The keys of the shorter solution, from the same initial board.
+    :rtype: List[int]
+    """
+
+    if radius < 0:
+        raise ValueError("the shortcut radius cannot be negative")
+    while True:
+        shorter = shortcut_pass(keys, radius)
+        if len(shorter) >= len(keys):
+            return keys
+        keys = shorter
+
+##############################################################################
+################  INCREMENTAL SEARCH: ########################################
+##############################################################################
+
+class Solver:
+    """
+    Solves boards one after another for an interactive client, which asks
+    for a hint after every move, reusing what the earlier searches found.
+    Every search is an astar with the heuristic raised by what was learned:
+
+    * The boards of each optimal path found get their exact distance and
+      the next board of the path, so a hint on one of them needs no search,
+      and a search stops as soon as it takes one of them out (see astar).
+    * Any other board reached in g moves by a search that found a solution
+      of C moves is at least C - g moves from the goal (as in Adaptive A*),
+      and that bound stays its heuristic if it beats the one given.
+    * The boards reached by a search that found no solution cannot reach
+      the goal, so later boards among them are answered without a search.
+
+    All of the boards are kept by their canonical keys, and what was learned
+    is forgotten when a board of another spec comes along.
+    """
+
+    def __init__(self, heuristic='manhattan', db=None):
+        """
+        :param heuristic: The heuristic to start from, a key of HEURISTICS.
+        :type heuristic: str
+        :param db: A goal distance database, needed by the db heuristic.
+        :type db: Optional[DistanceDB]
+        """
+
+        if heuristic == 'db' and db is None:
+            raise ValueError("the db heuristic needs a distance database")
+        self.heuristic = heuristic
+        self.db = db
+        self.spec = None # the spec of the boards below
+        self.stats = SearchStats() # work done by all of the searches
+        self.searches = 0
+
+    def board_key(self, board):
+        '''Return the key of a board, starting over if its spec is not the
+        one of the boards seen so far.'''
+        key = board_to_key(board)
+        check_key(key)
+        if board.spec != self.spec:
+            self.spec = board.spec
+            self.heuristics = {} # piece counts -> heuristic given
+            self.bounds = {}  # key -> least number of moves to the goal learned
+            self.next = {}  # key -> next key of an optimal path to the goal
+            self.dead = set()  # keys that cannot reach the goal
+        return key
+
+    def search(self, key):
+        '''Make sure the canonical key is in next, dead or a goal, searching
+        from it if it is not.'''
+        if key in self.next or key in self.dead or is_goal_key(key):
+            return
+        counts = piece_counts(key)
+        given = self.heuristics.get(counts)
+        if given is None:
+            if self.db is not None and not self.db.covers(key):
+                raise ValueError("the distance database was built for other pieces")
+            given = self.heuristics[counts] = HEURISTICS[self.heuristic](key, self.db)
+        bounds = self.bounds
+
+        def h(k):
+            return max(bounds.get(k, 0), given(k))
+
+        best_depth = {}
+        self.searches += 1
+        goal_state = astar(State(key, 0, 0), h, self.stats, self.next, best_depth)
+        if goal_state is None:
+            self.dead.update(best_depth)
+            return
+        moves = goal_state.depth
+        for k, depth in best_depth.items():
+            if moves - depth > bounds.get(k, 0):
+                bounds[k] = moves - depth
+        path = []
+        state = goal_state
+        while state is not None:
+            path.append(state.key)
+            state = state.parent
+        path.reverse()
+        for depth, (k, next_key) in enumerate(zip(path, path[1:])):
+            bounds[k] = moves - depth
+            self.next[k] = next_key
+
+    def solve(self, board):
+        """
+        Find an optimal solution from a board.
+
+        :param board: The board to start from.
+        :type board: Board
+        :return: The goal state, linked back to the (canonical) board through
+            the parents like the goal state of solve, or None if the goal
+            cannot be reached.
+        :rtype: Optional[State]
+        """
+
+        key = canonical_key(self.board_key(board))
+        self.search(key)
+        if key in self.dead:
+            return None
+        path = [key]
+        while not is_goal_key(path[-1]):
+            path.append(self.next[path[-1]])
+        return path_to_goal_state(path)
+
+    def hint(self, board):
+        """
+        Find the first move of an optimal solution from a board.
+
+        :param board: The board the player is at.
+        :type board: Board
+        :return: The move (anchor, direction) (see path_to_moves), or None if
+            the board is a goal or the goal cannot be reached from it.
+        :rtype: Optional[Tuple[int, str]]
+        """
+
+        key = self.board_key(board)
+        canonical = canonical_key(key)
+        self.search(canonical)
+        next_key = self.next.get(canonical)
+        if next_key is None:
+            return None
+        for new_key in key_successors(key):
+            if canonical_key(new_key) == next_key:
+                return find_move(key, new_key)
+
+    def distance(self, board):
+        '''Return the number of moves of an optimal solution from a board, or
+        None if the goal cannot be reached from it.'''
+        key = canonical_key(self.board_key(board))
+        self.search(key)
+        if key in self.dead:
+            return None
+        return self.bounds.get(key, 0) # exact on the optimal paths, 0 at a goal
+
+##############################################################################
+################  PARALLEL SEARCH: ###########################################
+##############################################################################
+
+# Hash distributed A* (HDA*): every canonical key is owned by one worker
+# process, picked by a hash of the key. A worker only expands the states it
+# owns, and sends the successors owned by other workers to their inboxes in
+# batches of (key, depth, parent key). Messages on the inboxes:
+#   ('states', [(key, depth, parent), ...])  states to add to the open list
+#   ('parent', key)  send (key, (depth, parent key)) of an owned key to the
+#                    replies, kept apart from the goals on the results
+#   ('stop',)  send the counts of the work done to the results and exit
+HDA_BATCH = 64 # states sent to another worker at once
+HDA_STEPS = 32 # states expanded between reading the inbox
+
+def owner(key, workers):
+    '''Return the index of the worker that owns a key.'''
+    return (((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 32) % workers
+
+def hda_worker(index, workers, spec, root_key, heuristic_name, dbfile, inboxes,
+               results, replies, incumbent, sent, received, idle):
+    '''The loop of one HDA* worker process (see hdastar).'''
+    use_spec(spec) # a spawned worker starts with the tables of the classic board
+    db = DistanceDB(dbfile) if dbfile else None
+    h = HEURISTICS[heuristic_name](root_key, db)
+    inbox = inboxes[index]
+    frontier = BucketQueue()
+    parents = {}  # owned key -> (least depth reached, parent key)
+    outboxes = [[] for _ in range(workers)]
+    expanded = generated = duplicates = max_frontier = 0
+
+    def add(key, depth, parent):
+        nonlocal duplicates
+        best = parents.get(key)
+        if best is not None and best[0] <= depth:
+            duplicates += 1
+            return
+        f = depth + h(key)
+        if f < incumbent.value:
+            parents[key] = (depth, parent)
+            frontier.push(f, depth, key)
+
+    while True:
+        # read the inbox, waiting for messages only when there is no work
+        while True:
+            try:
+                if frontier or any(outboxes):
+                    message = inbox.get_nowait()
+                else:
+                    message = inbox.get(timeout=0.01)
+            except queue.Empty:
+                break
+            if message[0] == 'states':
+                idle[index] = 0
+                received[index] += 1
+                for key, depth, parent in message[1]:
+                    add(key, depth, parent)
+            elif message[0] == 'parent':
+                replies.put((message[1], parents[message[1]]))
+            elif message[0] == 'stop':
+                results.put(('stats', expanded, generated, duplicates,
+                              max_frontier))
+                return
+
+        for _ in range(HDA_STEPS):
+            if not frontier:
+                break
+            _, depth, key = frontier.pop()
+            if parents[key][0] < depth:
+                duplicates += 1
+                continue  # reached at a lower depth since it was queued
+            if depth + h(key) >= incumbent.value:
+                frontier = BucketQueue() # nothing left can do better
+                break
+            if is_goal_key(key):
+                with incumbent.get_lock():
+                    if depth < incumbent.value:
+                        incumbent.value = depth
+                        results.put(('goal', depth, key))
+                continue
+            expanded += 1
+            for successor in canonical_successors(key):
+                generated += 1
+                i = owner(successor, workers)
+                if i == index:
+                    add(successor, depth + 1, key)
+                else:
+                    outboxes[i].append((successor, depth + 1, key))
+            max_frontier = max(max_frontier, len(frontier))
+
+        for i, outbox in enumerate(outboxes):
+            if outbox and (len(outbox) >= HDA_BATCH or not frontier):
+                sent[index] += 1
+                inboxes[i].put(('states', outbox))
+                outboxes[i] = []
+        if not frontier and not any(outboxes):
+            idle[index] = 1
+
+def hda_check(processes):
+    '''Raise RuntimeError if an HDA* worker died, since waiting for its
+    messages would never end. A worker only exits by itself (with code 0)
+    once it is stopped.'''
+    for process in processes:
+        if process.exitcode not in (None, 0):
+            raise RuntimeError('hdastar worker {} exited with code {}'.format(
+                process.name, process.exitcode))
+
+def hda_receive(channel, processes):
+    '''Wait for a message from the HDA* workers on a queue.'''
+    while True:
+        try:
+            return channel.get(timeout=0.1)
+        except queue.Empty:
+            hda_check(processes)
+
+def hdastar(initial_state, workers=None, heuristic='manhattan', db=None,
+            stats=None):
+    """
+    Hash distributed A* over worker processes (see hda_worker). A goal found
+    by any worker lowers the shared incumbent, and workers drop states with
+    f at or above it. The search is over when every worker is idle and every
+    batch sent was received, seen twice in a row with the same counts: then
+    no state with f below the incumbent is left, so the incumbent is optimal.
+    However the search ends (including an exception such as the SearchTimeout
+    of batch, or a worker that died), the workers are stopped.
+
+    :param initial_state: The state to start from.
+    :type initial_state: State
+    :param workers: The number of worker processes (default: one per CPU).
+    :type workers: Optional[int]
+    :param heuristic: The heuristic, a key of HEURISTICS.
+    :type heuristic: str
+    :param db: The distance database of the db heuristic.
+    :type db: Optional[DistanceDB]
+    :param stats: Where the work done by all workers is counted.
+    :type stats: Optional[SearchStats]
+    :return: The goal state of an optimal solution, or None
+    :rtype: Optional[State]
+    """
+
+    if stats is None:
+        stats = SearchStats()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    root = search_root(initial_state)
+    unreached = 1 << 62
+    inboxes = [multiprocessing.Queue() for _ in range(workers)]
+    results = multiprocessing.Queue()
+    replies = multiprocessing.Queue()
+    incumbent = multiprocessing.Value('q', unreached)
+    # batches sent by each worker (the last slot is this process) and
+    # received by each worker, and whether each worker is out of work
+    sent = multiprocessing.Array('q', workers + 1, lock=False)
+    received = multiprocessing.Array('q', workers, lock=False)
+    idle = multiprocessing.Array('b', workers, lock=False)
+    processes = [multiprocessing.Process(
+        target=hda_worker,
+        args=(i, workers, SPEC, root.key, heuristic,
+              db.filename if db else None, inboxes, results, replies, incumbent,
+              sent, received, idle))
+        for i in range(workers)]
+    try:
+        for process in processes:
+            process.start()
+
+        sent[workers] += 1
+        inboxes[owner(root.key, workers)].put(('states', [(root.key, 0, None)]))
+        goal = None  # (depth, key) of the best goal found
+        last = None
+        while True:
+            try:
+                _, depth, key = results.get(timeout=0.005)
+                if goal is None or depth < goal[0]:
+                    goal = (depth, key)
+                continue
+            except queue.Empty:
+                pass
+            snapshot = (all(idle), sum(sent), sum(received))
+            if snapshot == last and snapshot[0] and snapshot[1] == snapshot[2]:
+                break
+            last = snapshot
+            hda_check(processes)
+        # the message of the best goal can still be on its way
+        while incumbent.value < unreached and (goal is None or goal[0] > incumbent.value):
+            _, depth, key = hda_receive(results, processes)
+            if goal is None or depth < goal[0]:
+                goal = (depth, key)
+
+        path = []
+        if goal is not None:
+            key = goal[1]
+            while key is not None:
+                path.append(key)
+                inboxes[owner(key, workers)].put(('parent', key))
+                _, (_, key) = hda_receive(replies, processes)
+            path.reverse()
+        for inbox in inboxes:
+            inbox.put(('stop',))
+        # the frontiers of the workers peak at different times, so the sum of
+        # their peaks is an upper bound on the states queued at once
+        done = 0
+        while done < workers:
+            message = hda_receive(results, processes)
+            if message[0] != 'stats':
+                continue  # a goal no better than the one found
+            done += 1
+            _, expanded, generated, duplicates, max_frontier = message
+            stats.expanded += expanded
+            stats.generated += generated
+            stats.duplicates += duplicates
+            stats.max_frontier += max_frontier
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            if process.pid is not None:
+                process.join()
+        # a terminated worker can leave messages that nobody will read
+        for channel in inboxes + [results, replies]:
+            channel.cancel_join_thread()
+            channel.close()
+    return path_to_goal_state(path) if path else None
+
+##############################################################################
+################  BATCH SOLVING: #############################################
+##############################################################################
+
+class SearchTimeout(Exception):
+    """
+    Raised in a batch worker when a puzzle runs out of time.
+    """
+
+def board_from_str(text, goal=None):
+    '''Load a board from its rows, in the same format as the input file,
+    switching to its spec like read_from_file.'''
+    lines = text.splitlines()
+    use_spec(PuzzleSpec.from_rows(lines, goal))
+    return Board(parse_pieces(lines))
+
+def read_puzzles(source):
+    """
+    Read the puzzles of a batch. source can be a directory (all of the .txt
+    files in it), a glob pattern, or a single file. A .jsonl file has one
+    {"id": ..., "board": ...} object per line, where the board is a list of
+    rows or a string of rows separated by newlines. Any other file holds one
+    or more boards separated by empty lines (like the solution files).
+
+    :param source: Where the puzzles are.
+    :type source: str
+    :return: (id, board rows) of each puzzle
+    :rtype: Iterator[Tuple[str, str]]
+    """
+
+    if os.path.isdir(source):
+        filenames = sorted(glob.glob(os.path.join(source, '*.txt')))
+    elif os.path.isfile(source):
+        filenames = [source]
+    else:
+        filenames = sorted(glob.glob(source))
+
+    for filename in filenames:
+        puzzle_file = open(filename, "r")
+        if filename.endswith('.jsonl'):
+            for n, line in enumerate(puzzle_file, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                board = record['board']
+                if isinstance(board, list):
+                    board = '\n'.join(board)
+                yield str(record.get('id', '{}:{}'.format(filename, n))), board
+        else:
+            boards = [b for b in puzzle_file.read().split('\n\n') if b.strip()]
+            for n, board in enumerate(boards, 1):
+                yield (filename if len(boards) == 1
+                       else '{}:{}'.format(filename, n)), board
+        puzzle_file.close()
+
+worker_db = None # the distance database of a batch worker process
+
+def init_worker(dbfile):
+    '''Set up a batch worker process: open the distance database once.'''
+    global worker_db
+    if dbfile:
+        worker_db = DistanceDB(dbfile)
+
+def raise_timeout(signum, frame):
+    raise SearchTimeout()
+
+def solve_puzzle(puzzle_id, text, algo, heuristic=None, memory_limit=None,
+                 timeout=None, path=False, shorten=None, workers=None):
+    '''Solve one puzzle of a batch (in a worker process) and return its
+    result: a dict with the id, the status (solved, unsolvable, timeout or
+    error), the number of moves (and with path on, the moves themselves as
+    text, see moves_to_str), the counts of SearchStats and the time taken.
+    A search still running after timeout seconds is stopped. With a shorten
+    radius the solution is shortened (see shorten_path), and the moves it
+    had before are kept as unshortened_moves. workers is the number of
+    worker processes of hdastar.'''
+    stats = SearchStats()
+    result = {'id': puzzle_id}
+    time1 = time.time()
+    if timeout:
+        signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        key = board_to_key(board_from_str(text))
+        initial_state = State(key, heuristic_key(key), 0)
+        goal_state = solve(initial_state, algo, heuristic, worker_db,
+                           memory_limit, stats, workers)
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if goal_state is None:
+            result['status'] = 'unsolvable'
+        else:
+            result['status'] = 'solved'
+            result['moves'] = goal_state.depth
+            if path or shorten is not None:
+                keys = [state.key for state in get_solution(initial_state, goal_state)]
+            if shorten is not None:
+                keys = shorten_path(keys, shorten)
+                result['unshortened_moves'] = goal_state.depth
+                result['moves'] = len(keys) - 1
+            if path:
+                result['solution'] = moves_to_str(path_to_moves(keys))
+    except SearchTimeout:
+        result['status'] = 'timeout'
+    except Exception as e:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        result['status'] = 'error'
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+    result.update(stats.as_dict())
+    result['seconds'] = round(time.time() - time1, 4)
+    return result
+
+def precheck_puzzle(puzzle_id, text, index=None):
+    '''Check a puzzle of a batch before it is sent to a worker. Return its
+    result (see solve_puzzle) if the board is not valid, or if the component
+    index says it cannot reach the goal, and None if it has to be solved.'''
+    try:
+        key = board_to_key(board_from_str(text))
+        check_key(key)
+    except Exception as e:
+        return {'id': puzzle_id, 'status': 'error',
+                'error': '{}: {}'.format(type(e).__name__, e)}
+    if index is not None and index.covers(key) and not index.solvable(key):
+        return {'id': puzzle_id, 'status': 'unsolvable', 'expanded': 0,
+                'generated': 0, 'seconds': 0.0}
+    return None
+
+def solve_batch(puzzles, outputfile, algo, heuristic=None, dbfile=None,
+                memory_limit=None, timeout=None, workers=None, indexfile=None,
+                shorten=None):
+    '''Solve (id, board rows) puzzles in a pool of worker processes and write
+    each result (see solve_puzzle) to outputfile as a JSON line as soon as it
+    is ready. Every puzzle is checked first (see precheck_puzzle, with the
+    component index in indexfile if given), and only the ones that need a
+    search are sent to the workers. hdastar has worker processes of its
+    own, so with it the puzzles are solved one at a time, each by workers
+    hdastar workers. With a shorten radius the solutions are shortened (see
+    shorten_path). Return the number of puzzles with each status.'''
+    counts = {}
+    out = open(outputfile, "w")
+
+    def write(result):
+        out.write(json.dumps(result) + '\n')
+        out.flush()
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+
+    index = ComponentIndex(indexfile) if indexfile else None
+    to_solve = []
+    for puzzle_id, text in puzzles:
+        result = precheck_puzzle(puzzle_id, text, index)
+        if result is None:
+            to_solve.append((puzzle_id, text))
+        else:
+            write(result)
+    search_workers = None
+    if algo == 'hdastar':
+        workers, search_workers = 1, workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(dbfile,)) as pool:
+        futures = {pool.submit(solve_puzzle, puzzle_id, text, algo, heuristic,
+                               memory_limit, timeout, shorten=shorten,
+                               workers=search_workers): puzzle_id
+                   for puzzle_id, text in to_solve}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e: # the worker process died
+                result = {'id': futures[future], 'status': 'error',
+                          'error': '{}: {}'.format(type(e).__name__, e)}
+            write(result)
+    out.close()
+    return counts
+
+##############################################################################
+################  SOLVER SERVICE: ############################################
+##############################################################################
+
+# The serve command answers HTTP requests on localhost or a Unix socket from
+# one long-lived process: the move tables, the distance database, the
+# component index and the solution cache stay loaded between requests, and
+# searches run in a pool of worker processes that are started once. Boards
+# that need no search (cached, invalid, unsolvable by the index, already at
+# the goal, or looked up in the database) are answered without the pool.
+# asyncio is only imported by the functions of the service, as importing it
+# adds about 10 MB to every process that loads this module.
+SERVE_HOST = '127.0.0.1'
+SERVE_PORT = 8384
+SERVE_GRACE = 1.0 # seconds a worker gets past a deadline to stop by itself
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                405: 'Method Not Allowed', 500: 'Internal Server Error',
+                504: 'Gateway Timeout'}
+
+def solve_until(text, algo, heuristic, memory_limit, deadline):
+    '''Solve a board for the service (in a worker process) with its moves,
+    see solve_puzzle. deadline is the time.time() at which to give up, which
+    may already have passed while the request waited for a worker.'''
+    timeout = None
+    if deadline is not None:
+        timeout = deadline - time.time()
+        if timeout <= 0:
+            return {'id': None, 'status': 'timeout', 'seconds': 0.0}
+    return solve_puzzle(None, text, algo, heuristic, memory_limit, timeout,
+                        path=True)
+
+class SolverService:
+    """
+    The state of the serve command shared by all of its connections.
+    """
+
+    def __init__(self, algo='astar', heuristic=None, dbfile=None, indexfile=None,
+                 memory_limit=None, timeout=None, workers=None, cachefile=None):
+        """
+        :param algo: The default algorithm, one of ALGORITHMS.
+        :type algo: str
+        :param heuristic: The heuristic of the searches (see solve).
+        :type heuristic: Optional[str]
+        :param dbfile: A goal distance database, opened once by the service
+            and by each worker.
+        :type dbfile: Optional[str]
+        :param indexfile: A component index, to answer unsolvable boards
+            without a search.
+        :type indexfile: Optional[str]
+        :param memory_limit: Memory budget in MB of idastar, smastar and ddbfs.
+        :type memory_limit: Optional[float]
+        :param timeout: The default seconds a request may take.
+        :type timeout: Optional[float]
+        :param workers: The number of worker processes (default: one per CPU).
+        :type workers: Optional[int]
+        :param cachefile: The SQLite file of the solution cache, or None to
+            only cache in memory.
+        :type cachefile: Optional[str]
+        """
+
+        self.algo = algo
+        self.heuristic = heuristic
+        init_worker(dbfile) # for the boards answered by the service itself
+        self.index = ComponentIndex(indexfile) if indexfile else None
+        self.memory_limit = memory_limit
+        self.timeout = timeout
+        self.cache = SolutionCache(cachefile)
+        self.workers = workers
+        self.dbfile = dbfile
+        self.pool = self.start_pool()
+        self.counts = {} # status -> number of requests answered with it
+
+    def start_pool(self):
+        '''Start the worker processes, before any request needs them.'''
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                   initargs=(self.dbfile,))
+        pool.submit(int).result()
+        return pool
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        self.cache.close()
+
+    def answer(self, text, algo):
+        '''Return the result of a board (see solve_puzzle, with the moves of
+        the solution and whether it was cached) if it can be found without a
+        search, else None.'''
+        result = precheck_puzzle(None, text, self.index)
+        if result is not None:
+            return result
+        key = board_to_key(board_from_str(text))
+        name = cache_name(algo, heuristic=self.heuristic, db=worker_db)
+        # an optimal algorithm without a memory limit has to answer optimally
+        optimal = algo in OPTIMAL_ALGORITHMS and self.memory_limit is None
+        hit = self.cache.get(key, name, optimal) if name else None
+        if hit is not None:
+            moves, _ = hit
+            if moves is None:
+                return {'id': None, 'status': 'unsolvable', 'cached': True}
+            return {'id': None, 'status': 'solved', 'moves': len(moves),
+                    'solution': moves_to_str(moves), 'cached': True}
+        if is_goal_key(key) or algo == 'lookup':
+            result = solve_puzzle(None, text, algo, self.heuristic,
+                                  self.memory_limit, path=True)
+            result['cached'] = False
+            self.store(key, name, algo, result)
+            return result
+        return None
+
+    def store(self, key, name, algo, result):
+        '''Put the solution of a result in the cache. With a memory limit,
+        a search can fail or miss the shortest solution for lack of memory,
+        so its solutions are not stored as optimal and its failures are not
+        stored (see solve_cached).'''
+        if name is None or result['status'] not in ('solved', 'unsolvable'):
+            return
+        limited = self.memory_limit is not None
+        if result['status'] == 'unsolvable':
+            if not limited:
+                self.cache.put(key, name, None, algo in OPTIMAL_ALGORITHMS)
+            return
+        self.cache.put(key, name, str_to_moves(result['solution']),
+                       algo in OPTIMAL_ALGORITHMS and not limited)
+
+    async def solve(self, text, algo=None, timeout=None):
+        """
+        Solve a board, in a worker process unless it needs no search.
+
+        :param text: The rows of the board, in the same format as the input file.
+        :type text: str
+        :param algo: The algorithm (default: the one of the service).
+        :type algo: Optional[str]
+        :param timeout: Seconds after which to give up (default: the timeout
+            of the service).
+        :type timeout: Optional[float]
+        :return: The result (see solve_puzzle) without an id, with the moves
+            of the solution as text (see moves_to_str) and whether it was
+            found in the cache.
+        :rtype: dict
+        """
+
+        import asyncio
+        time1 = time.time()
+        algo = algo or self.algo
+        if timeout is None:
+            timeout = self.timeout
+        if algo not in ALGORITHMS:
+            result = {'id': None, 'status': 'error',
+                      'error': 'ValueError: unknown algorithm {}'.format(algo)}
+        else:
+            result = self.answer(text, algo)
+        if result is None:
+            deadline = None if timeout is None else time1 + timeout
+            future = self.pool.submit(solve_until, text, algo, self.heuristic,
+                                      self.memory_limit, deadline)
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.wrap_future(future),
+                    None if timeout is None else timeout + SERVE_GRACE)
+            except asyncio.TimeoutError: # the worker did not stop in time
+                result = {'id': None, 'status': 'timeout'}
+            except Exception as e: # the worker died or the pool is broken
+                result = {'id': None, 'status': 'failed',
+                          'error': '{}: {}'.format(type(e).__name__, e)}
+                if isinstance(e, BrokenProcessPool):
+                    self.pool.shutdown(wait=False, cancel_futures=True)
+                    self.pool = self.start_pool()
+            finally:
+                future.cancel() # if it is still waiting for a worker
+            result['cached'] = False
+            self.store(board_to_key(board_from_str(text)),
+                       cache_name(algo, heuristic=self.heuristic, db=worker_db),
+                       algo, result)
+        del result['id']
+        result['seconds'] = round(time.time() - time1, 6)
+        self.counts[result['status']] = self.counts.get(result['status'], 0) + 1
+        return result
+
+    def status(self):
+        '''Return the counts of the requests answered and of the cache.'''
+        return {'requests': self.counts, 'cache_hits': self.cache.hits,
+                'cache_misses': self.cache.misses}
+
+    async def handle(self, reader, writer):
+        '''Answer the HTTP requests of one connection until it is closed:
+        POST /solve with the rows of a board as the body (and optionally
+        ?algo=...&timeout=... in the path), or GET /status.'''
+        import asyncio
+        try:
+            while True:
+                try:
+                    request = await read_http_request(reader)
+                except ValueError as e: # the rest of the stream cannot be trusted
+                    write_http_response(writer, 400, {'error': str(e)},
+                                        keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                code = 200
+                if path == '/solve' and method == 'POST':
+                    try:
+                        timeout = query.get('timeout')
+                        result = await self.solve(
+                            body.decode(), query.get('algo'),
+                            None if timeout is None else float(timeout))
+                    except ValueError as e: # a bad timeout or body
+                        result = {'status': 'error',
+                                  'error': '{}: {}'.format(type(e).__name__, e)}
+                    if result['status'] == 'error':
+                        code = 400
+                    elif result['status'] == 'failed':
+                        code = 500
+                    elif result['status'] == 'timeout':
+                        code = 504
+                elif path == '/status' and method == 'GET':
+                    result = self.status()
+                elif path in ('/solve', '/status'):
+                    code, result = 405, {'error': 'method not allowed'}
+                else:
+                    code, result = 404, {'error': 'not found'}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                write_http_response(writer, code, result, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def read_http_request(reader):
+    '''Read one HTTP request. Return (method, path, query, headers, body),
+    with the query and the (lower case) headers as dicts, or None at the end
+    of the connection. Raise a ValueError if the request line or the
+    Content-Length header is malformed.'''
+    import urllib.parse
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    line = line.decode('latin-1')
+    fields = line.split(' ', 2)
+    if len(fields) != 3:
+        raise ValueError("bad request line {!r}".format(line.strip()))
+    method, target, _ = fields
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = headers.get('content-length', '0')
+    if not length.isdigit():
+        raise ValueError("bad Content-Length {!r}".format(length))
+    body = await reader.readexactly(int(length))
+    path, _, query = target.partition('?')
+    query = dict(urllib.parse.parse_qsl(query))
+    return method, path, query, headers, body
+
+def write_http_response(writer, code, result, keep_alive=True):
+    '''Write a JSON HTTP response.'''
+    body = (json.dumps(result) + '\n').encode()
+    writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\n'
+                 'Content-Length: {}\r\nConnection: {}\r\n\r\n'.format(
+                     code, HTTP_REASONS[code], len(body),
+                     'keep-alive' if keep_alive else 'close').encode() + body)
+
+async def serve(service, socket_path=None, host=SERVE_HOST, port=SERVE_PORT):
+    '''Run the service on a Unix socket if a path is given, else on a TCP
+    port, until it gets SIGINT or SIGTERM.'''
+    import asyncio
+    if socket_path:
+        server = await asyncio.start_unix_server(service.handle, socket_path)
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, server.close)
+    async with server:
+        try:
+            await server.serve_forever()
+        except asyncio.CancelledError: # closed by a signal
+            pass
+
+##############################################################################
+################  BENCHMARKS: ################################################
+##############################################################################
+
+# The corpus of the bench command and the results it is compared against.
+BENCH_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'bench', 'puzzles')
+BENCH_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'bench', 'baseline.json')
+# Every algorithm that does not need a distance database (or NumPy if it is
+# not installed).
+BENCH_ALGORITHMS = [algo for algo in ALGORITHMS if algo != 'lookup' and
+                    (algo != 'npbfs' or importlib.util.find_spec('numpy'))]
+# The measurements that count as a regression when they grow. The times are
+# compared with a threshold of their own, as they are much noisier than the
+# counts of the searches.
+BENCH_METRICS = ('seconds', 'expanded', 'generated', 'max_frontier', 'max_rss_kb')
+BENCH_MIN_SECONDS = 0.1 # timing differences below this are noise
+# The worker processes of hdastar. Its counts grow with the number of
+# workers, so it is fixed rather than one per CPU of the machine.
+BENCH_WORKERS = 2
+
+def bench_case(puzzle_id, text, algo, dbfile=None, timeout=None):
+    '''Solve one puzzle of the benchmark with one algorithm, in a process of
+    its own, and return its result (see solve_puzzle) with the algorithm and
+    the peak memory of the process in KB. hdastar runs with BENCH_WORKERS
+    workers.'''
+    init_worker(dbfile)
+    result = solve_puzzle(puzzle_id, text, algo, timeout=timeout,
+                          workers=BENCH_WORKERS)
+    result['algo'] = algo
+    result['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+def run_bench(puzzles, algos, dbfile=None, timeout=None, repeat=1):
+    '''Run every algorithm on every (id, board rows) puzzle, one at a time in
+    a new process so that the peak memory of each run is its own. Each run is
+    repeated (unless it times out) and the fastest one is kept. Yield the
+    result of each algorithm on each puzzle.'''
+    context = multiprocessing.get_context('spawn')
+    for puzzle_id, text in puzzles:
+        for algo in algos:
+            best = None
+            for _ in range(repeat):
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    future = pool.submit(bench_case, puzzle_id, text, algo,
+                                         dbfile, timeout)
+                    try:
+                        result = future.result()
+                    except Exception as e: # the process died
+                        result = {'id': puzzle_id, 'algo': algo, 'status': 'error',
+                                  'error': '{}: {}'.format(type(e).__name__, e)}
+                if best is None or (result.get('seconds', math.inf)
+                                    < best.get('seconds', math.inf)):
+                    best = result
+                if result['status'] in ('timeout', 'error'):
+                    break
+            yield best
+
+def compare_bench(results, baseline, threshold, time_threshold):
+    """
+    Compare benchmark results with the results of an earlier run.
+
+    :param results: The results of this run (see bench_case).
+    :type results: List[dict]
+    :param baseline: The results of the earlier run.
+    :type baseline: List[dict]
+    :param threshold: How much a measurement may grow, as a fraction of the
+        baseline (0.25 is 25%).
+    :type threshold: float
+    :param time_threshold: How much the time may grow, as a fraction of the
+        baseline.
+    :type time_threshold: float
+    :return: A message for each regression: a different status or number of
+        moves, or a measurement that grew by more than its threshold. The
+        measurements of runs that timed out are not compared, nor is the
+        peak frontier of hdastar. Then the names of the runs with no result
+        in the baseline to compare with.
+    :rtype: Tuple[List[str], List[str]]
+    """
+
+    old = {(result['id'], result['algo']): result for result in baseline}
+    regressions = []
+    missing = []
+    for result in results:
+        name = '{} {}'.format(result['id'], result['algo'])
+        base = old.get((result['id'], result['algo']))
+        if base is None:
+            missing.append(name)
+            continue
+        for field in ('status', 'moves'):
+            if result.get(field) != base.get(field):
+                regressions.append('{}: {} {} -> {}'.format(
+                    name, field, base.get(field), result.get(field)))
+        if result['status'] == 'timeout' or base['status'] == 'timeout':
+            continue
+        for metric in BENCH_METRICS:
+            if metric not in result or metric not in base:
+                continue
+            if metric == 'max_frontier' and result['algo'] == 'hdastar':
+                continue  # depends on how the workers happen to be scheduled
+            allowed = base[metric] * threshold
+            if metric == 'seconds':
+                allowed = max(base[metric] * time_threshold, BENCH_MIN_SECONDS)
+            if result[metric] - base[metric] > allowed:
+                regressions.append('{}: {} {} -> {} (+{:.0%})'.format(
+                    name, metric, base[metric], result[metric],
+                    (result[metric] - base[metric]) / base[metric]
+                    if base[metric] else float('inf')))
+    return regressions, missing
+
+##############################################################################
+################  SOLUTION CACHE: ############################################
+##############################################################################
+
+# The algorithms that always find a solution with the least number of moves
+# (astar, idastar and smastar as long as the heuristic is admissible).
+OPTIMAL_ALGORITHMS = ('astar', 'lookup', 'bidir', 'idastar', 'smastar', 'hdastar',
+                      'npbfs', 'ddbfs')
+
+def find_move(key, new_key):
+    '''Return the move (anchor, direction) that turns key into new_key (see
+    shape_moves), or None if there is no such move.'''
+    for mask, value, delta, anchor, direction in MOVES.get(cells_with_code(key, EMPTY), ()):
+        if key & mask == value and key ^ delta == new_key:
+            return anchor, direction
+    return None
+
+def path_to_moves(keys):
+    '''Given the keys of a solution (one move apart), return its moves as
+    (anchor, direction) pairs: the cell of the top left corner of the piece
+    that moves, and 'u', 'd', 'l' or 'r'.'''
+    return [find_move(key, new_key) for key, new_key in zip(keys, keys[1:])]
+
+def moves_to_path(key, moves):
+    '''Make the (anchor, direction) moves one after another from a key and
+    return the keys of the boards on the way, starting with key.'''
+    keys = [key]
+    for anchor, direction in moves:
+        for mask, value, delta, a, d in MOVES.get(cells_with_code(key, EMPTY), ()):
+            if a == anchor and d == direction and key & mask == value:
+                key ^= delta
+                break
+        else:
+            raise ValueError("cannot move the piece at {} {}".format(anchor, direction))
+        keys.append(key)
+    return keys
+
+def mirror_moves(key, moves):
+    '''Given moves from a key, return the same moves made from the mirror
+    image of the key.'''
+    return path_to_moves([mirror_key(k) for k in moves_to_path(key, moves)])
+
+def moves_to_str(moves):
+    '''Write moves as text: the anchor cell and the direction of each move,
+    separated by spaces (like "13d 9l").'''
+    return ' '.join('{}{}'.format(anchor, direction) for anchor, direction in moves)
+
+def str_to_moves(text):
+    '''Read moves written by moves_to_str.'''
+    moves = []
+    for move in text.split():
+        if len(move) < 2 or move[-1] not in 'udlr' or not move[:-1].isdigit():
+            raise ValueError("bad move {!r}".format(move))
+        moves.append((int(move[:-1]), move[-1]))
+    return moves
+
+class SolutionCache:
+    """
+    Cache of solutions keyed on the canonical key of the initial board and
+    the algorithm: a least recently used dict in memory in front of an
+    SQLite file. A solution is stored as its moves from the canonical board
+    (None if the goal cannot be reached) and whether it is optimal. Keys of
+    larger boards do not fit in an SQLite integer, so the file holds them
+    as bytes (see row_key).
+    """
+
+    def __init__(self, filename=None, max_entries=1024, max_rows=100000):
+        """
+        :param filename: The SQLite file, or None to only cache in memory.
+        :type filename: Optional[str]
+        :param max_entries: The most solutions kept in memory.
+        :type max_entries: int
+        :param max_rows: The most solutions kept in the file. The least
+            recently used ones are deleted past that.
+        :type max_rows: int
+        """
+
+        self.memory = OrderedDict()  # (canonical key, algo) -> (moves, optimal)
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if filename:
+            directory = os.path.dirname(filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.db = sqlite3.connect(filename)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions ("
+                            "key BLOB, algo TEXT, moves TEXT, optimal INTEGER, "
+                            "used INTEGER, PRIMARY KEY (key, algo))")
+            self.db.execute("CREATE INDEX IF NOT EXISTS solutions_used "
+                            "ON solutions (used)")
+            self.clock = self.db.execute(
+                "SELECT COALESCE(MAX(used), 0) FROM solutions").fetchone()[0]
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    @staticmethod
+    def row_key(entry):
+        '''The (key, algo) of an entry as stored in the file.'''
+        key, algo = entry
+        return key.to_bytes(8 * KEY_WORDS, 'big'), algo
+
+    def remember(self, entry, value):
+        '''Put a solution in the memory cache, dropping the least recently
+        used one if it is full.'''
+        self.memory[entry] = value
+        self.memory.move_to_end(entry)
+        if len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key, algo, optimal=False):
+        """
+        Look up the solution of a board.
+
+        :param key: The key of the initial board (not necessarily canonical).
+        :type key: int
+        :param algo: The algorithm the solution was found with.
+        :type algo: str
+        :param optimal: Only return a solution stored as optimal (a solution
+            that is not counts as a miss).
+        :type optimal: bool
+        :return: None on a miss, else (moves from key, optimal), where moves
+            is None if the goal cannot be reached
+        :rtype: Optional[Tuple[Optional[List[Tuple[int, str]]], bool]]
+        """
+
+        canonical = canonical_key(key)
+        entry = (canonical, algo)
+        value = self.memory.get(entry)
+        if value is not None:
+            self.memory.move_to_end(entry)
+        elif self.db is not None:
+            row = self.db.execute("SELECT moves, optimal FROM solutions "
+                                  "WHERE key = ? AND algo = ?",
+                                  self.row_key(entry)).fetchone()
+            if row is not None:
+                self.clock += 1
+                self.db.execute("UPDATE solutions SET used = ? WHERE key = ? "
+                                "AND algo = ?", (self.clock,) + self.row_key(entry))
+                self.db.commit()
+                moves = None if row[0] is None else str_to_moves(row[0])
+                value = (moves, bool(row[1]))
+                self.remember(entry, value)
+        if value is not None and optimal and not value[1]:
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        moves, optimal = value
+        if moves is not None and key != canonical:
+            moves = mirror_moves(canonical, moves)
+        return moves, optimal
+
+    def put(self, key, algo, moves, optimal):
+        '''Store the moves (None if the goal cannot be reached) of a solution
+        from the board key found with algo.'''
+        canonical = canonical_key(key)
+        if moves is not None and key != canonical:
+            moves = mirror_moves(key, moves)
+        entry = (canonical, algo)
+        self.remember(entry, (moves, optimal))
+        if self.db is not None:
+            self.clock += 1
+            text = None if moves is None else moves_to_str(moves)
+            self.db.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)",
+                            self.row_key(entry) + (text, int(optimal), self.clock))
+            self.db.execute("DELETE FROM solutions WHERE used <= ("
+                            "SELECT used FROM solutions ORDER BY used DESC "
+                            "LIMIT 1 OFFSET ?)", (self.max_rows,))
+            self.db.commit()
+
+def cache_name(algo, weight=None, depth_limit=None, heuristic=None, db=None):
+    '''Return the name the solutions of an algorithm are cached under, or
+    None if they are not cached. The solutions of arastar depend on its
+    budget and those of dfs with a depth limit on the limit, so they are not
+    cached, and those of wastar are cached per weight. The solutions of the
+    algorithms that are not optimal also depend on the heuristic (see
+    solve), so they are cached per heuristic, and with the db heuristic per
+    database file (pdb is built from the pieces of the board, which the key
+    already fixes). Keys of different specs can be equal, so the solutions
+    of boards other than the classic one are cached per spec.'''
+    if algo == 'arastar' or depth_limit is not None:
+        return None
+    name = algo
+    if algo == 'wastar':
+        name = 'wastar:{}'.format(weight or DEFAULT_WEIGHT)
+    if algo not in OPTIMAL_ALGORITHMS:
+        if heuristic is None:
+            heuristic = 'db' if db else 'manhattan'
+        name += '/' + heuristic
+        if heuristic == 'db' and db is not None:
+            name += '=' + os.path.abspath(db.filename)
+    if SPEC != CLASSIC:
+        name += '@' + SPEC.name
+    return name
+
+def solve_cached(cache, initial_state, algo, *args, **kwargs):
+    '''Like solve, but look the solution up in a SolutionCache first, and
+    store it there after solving (see cache_name). A search run with a
+    memory limit can fail or miss the shortest solution for lack of memory,
+    so its solutions are not stored as optimal, and its failures are not
+    stored at all.'''
+    options = inspect.signature(solve).bind(initial_state, algo, *args,
+                                            **kwargs).arguments
+    name = cache_name(algo, options.get('weight'), options.get('depth_limit'),
+                      options.get('heuristic'), options.get('db'))
+    if name is None:
+        return solve(initial_state, algo, *args, **kwargs)
+    limited = options.get('memory_limit') is not None
+    # an optimal algorithm without a memory limit has to answer optimally
+    hit = cache.get(initial_state.key, name,
+                    algo in OPTIMAL_ALGORITHMS and not limited)
+    if hit is not None:
+        moves, _ = hit
+        if moves is None:
+            return None
+        return path_to_goal_state(moves_to_path(initial_state.key, moves))
+    goal_state = solve(initial_state, algo, *args, **kwargs)
+    if goal_state is None:
+        if not limited:
+            cache.put(initial_state.key, name, None, algo in OPTIMAL_ALGORITHMS)
+        return None
+    moves = path_to_moves([state.key for state in
+                           get_solution(initial_state, goal_state)])
+    cache.put(initial_state.key, name, moves,
+              algo in OPTIMAL_ALGORITHMS and not limited)
+    return goal_state
+
+# Formats of the solution file: every board (like the input file), the
+# initial board followed by the moves (see moves_to_str), or JSON.
+FORMATS = ('boards', 'moves', 'json')
+
+def convert_to_str(state):
+    '''Given a state, return a string representation of the board with proper
+    formatting (5x4).'''
+    grid_str = key_to_str(state.key)
+    rows = [grid_str[i:i+WIDTH] for i in range(0, CELLS, WIDTH)]
+    return '\n'.join(rows) + '\n\n' # add newline at end of board
+
+def write_solution(solution, outputfile, fmt='boards'): #TODO
+    '''Given a list of states that lead from the initial state to the solved 
+    goal state, write the solution steps to the output file in one of FORMATS.
+    The boards are written one at a time.'''
+
+    with open(outputfile, "w") as file:
+        if fmt == 'boards':
+            for state in solution:  # solution is a list of states
+                file.write(convert_to_str(state))
+            return
+        moves = path_to_moves([state.key for state in solution])
+        if fmt == 'moves':
+            file.write(convert_to_str(solution[0]))
+            file.write(moves_to_str(moves) + '\n')
+        else:
+            grid_str = key_to_str(solution[0].key)
+            json.dump({'board': [grid_str[i:i+WIDTH] for i in range(0, CELLS, WIDTH)],
+                       'moves': moves_to_str(moves).split()}, file)
+            file.write('\n')
+
+def read_solution(inputfile):
+    """
+    Read a solution written by write_solution in any of FORMATS.
+
+    :param inputfile: The solution file.
+    :type inputfile: str
+    :return: The keys of the boards from the initial board to the goal.
+    :rtype: List[int]
+    """
+
+    with open(inputfile) as file:
+        text = file.read()
+    if text.lstrip().startswith('{'):
+        solution = json.loads(text)
+        board = solution['board']
+        if not isinstance(board, str):
+            board = '\n'.join(board)
+        key = board_to_key(board_from_str(board))
+        return moves_to_path(key, str_to_moves(' '.join(solution['moves'])))
+    blocks = [block.strip() for block in text.split('\n\n') if block.strip()]
+    keys = [board_to_key(board_from_str(blocks[0]))]
+    for block in blocks[1:]:
+        if block[-1] not in CODE_CHARS: # moves end with a direction
+            keys.extend(moves_to_path(keys[-1], str_to_moves(block))[1:])
+        else:
+            key = board_to_key(board_from_str(block))
+            if find_move(keys[-1], key) is None:
+                raise ValueError("board {} is not one move from the one before "
+                                 "it".format(len(keys) + 1))
+            keys.append(key)
+    return keys
+
+def profile_call(filename, function, *args, **kwargs):
+    '''Call function under cProfile and tracemalloc and return its result.
+    The profile is written to filename (see pstats), and the functions with
+    the most cumulative time and the lines that allocated the most memory are
+    printed. The function still runs if it raises.'''
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        profiler.dump_stats(filename)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+        print("memory: {:.1f} MB peak, {:.1f} MB at the end".format(
+            peak / 2**20, current / 2**20))
+        for stat in snapshot.statistics('lineno')[:10]:
+            print(stat)
+
+# The exit status of the solve command for a board that cannot reach the goal.
+EXIT_UNSOLVABLE = 3
+
+def goal_cell(text):
+    '''Read a cell written as x,y (the type of the --goal option).'''
+    try:
+        x, y = text.split(',')
+        return int(x), int(y)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected x,y, got {!r}".format(text))
+
+def solve_command(argv):
+    '''Solve the puzzle in an input file and write the solution steps to the
+    output file. Exit with EXIT_UNSOLVABLE if there is no solution.'''
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--inputfile",
+        type=str,
+        required=True,
+        help="The input file that contains the puzzle."
+    )
+    parser.add_argument(
+        "--outputfile",
+        type=str,
+        required=True,
+        help="The output file that contains the solution."
+    )
+    parser.add_argument(
+        "--algo",
+        type=str,
+        required=True,
+        choices=ALGORITHMS,
+        help="The searching algorithm."
+    )
+    parser.add_argument(
+        "--dbfile",
+        type=str,
+        help="A goal distance database (see build-db). Required by lookup, "
+             "used as the heuristic by astar."
+    )
+    parser.add_argument(
+        "--heuristic",
+        type=str,
+        choices=list(HEURISTICS),
+        help="The heuristic of astar, idastar and smastar, and the move order "
+             "of dfs (default: db with --dbfile, manhattan otherwise)."
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=float,
+        help="Memory budget in MB for the transposition table of idastar, "
+             "the nodes of smastar or the successors ddbfs holds before "
+             "spilling them to disk (default: no limit, and ddbfs spills "
+             "every {} keys).".format(SPILL_ENTRIES)
+    )
+    parser.add_argument(
+        "--spill-dir",
+        type=str,
+        help="Where ddbfs writes its files (default: the system temporary "
+             "directory)."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="The number of worker processes of hdastar (default: one per CPU)."
+    )
+    parser.add_argument(
+        "--weight",
+        type=float,
+        help="The weight of the heuristic in wastar, and the first weight of "
+             "arastar (default: {}).".format(DEFAULT_WEIGHT)
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        help="Seconds after which arastar stops improving its solution."
+    )
+    parser.add_argument(
+        "--node-budget",
+        type=int,
+        help="States expanded after which arastar stops improving its solution."
+    )
+    parser.add_argument(
+        "--indexfile",
+        type=str,
+        help="A component index (see build-index), to reject boards that "
+             "cannot reach the goal without searching."
+    )
+    parser.add_argument(
+        "--depth-limit",
+        type=int,
+        help="The most moves dfs searches from the initial board."
+    )
+    parser.add_argument(
+        "--shorten",
+        type=int,
+        nargs="?",
+        const=SHORTCUT_RADIUS,
+        help="Shorten the solution after the search: remove its loops and "
+             "splice in the shortcuts found by searching up to this many moves "
+             "around each of its boards (default: {}), and print the moves "
+             "before and after. For dfs, greedy, wastar and arastar, whose "
+             "solutions can be longer than needed.".format(SHORTCUT_RADIUS)
+    )
+    parser.add_argument(
+        "--goal",
+        type=goal_cell,
+        help="The cell x,y where the top left corner of the 2x2 piece has to "
+             "end up (default: the middle of the two bottom rows, 1,3 on the "
+             "classic board)."
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=FORMATS,
+        default='boards',
+        help="How to write the solution: every board, the initial board and "
+             "the moves, or JSON (default: boards)."
+    )
+    parser.add_argument(
+        "--stats",
+        type=str,
+        nargs="?",
+        const="-",
+        help="Write the counts of the search and the time spent in each part "
+             "of it as JSON to this file, or print them with no file. Timing "
+             "the parts slows the search down."
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help="Run the search under cProfile and tracemalloc, write the "
+             "profile to this file and print a summary. Skips the cache."
+    )
+    parser.add_argument(
+        "--cachefile",
+        type=str,
+        help="A solution cache (an SQLite file, made if missing) to look the "
+             "solution up in before searching and to store it in after "
+             "(default: no cache)."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always search, without reading or writing --cachefile."
+    )
+    args = parser.parse_args(argv)
+    if args.shorten is not None and args.shorten < 0:
+        parser.error("the shortcut radius cannot be negative")
+
+    # read the board from the file
+    try:
+        board = read_from_file(args.inputfile, args.goal)
+    except ValueError as e:
+        parser.error(str(e))
+    # print("initial state: ")
+    # board.display()
+    initial_state = State(board_to_key(board),heuristic(board),0)
+    db = DistanceDB(args.dbfile) if args.dbfile else None
+    if args.indexfile:
+        # the index only answers for the board, goal and pieces it was built
+        # for (see ComponentIndex.covers), other boards are searched
+        index = ComponentIndex(args.indexfile)
+        try:
+            check_key(initial_state.key)
+        except ValueError as e:
+            parser.error(str(e))
+        if index.covers(initial_state.key) and not index.solvable(initial_state.key):
+            print("no solution: the goal cannot be reached from this board",
+                  file=sys.stderr)
+            sys.exit(EXIT_UNSOLVABLE)
+    # print()
+    time1 = time.time()
+    stats = SearchStats(timing=args.stats is not None)
+    use_cache = args.cachefile and not args.no_cache and not args.profile
+    cache = SolutionCache(args.cachefile) if use_cache else None
+    try:
+        options = dict(weight=args.weight, time_budget=args.time_budget,
+                       node_budget=args.node_budget, depth_limit=args.depth_limit,
+                       spill_dir=args.spill_dir)
+        if args.profile:
+            final_goal_state = profile_call(args.profile, solve, initial_state,
+                                            args.algo, args.heuristic, db,
+                                            args.memory_limit, stats, args.workers,
+                                            **options)
+        elif cache is None:
+            final_goal_state = solve(initial_state, args.algo, args.heuristic, db,
+                                     args.memory_limit, stats, args.workers,
+                                     **options)
+        else:
+            final_goal_state = solve_cached(cache, initial_state, args.algo,
+                                            args.heuristic, db, args.memory_limit,
+                                            stats, args.workers, **options)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        if cache is not None:
+            cache.close()
+    time2 = time.time()
+    if final_goal_state is None:
+        print("no solution: the goal cannot be reached from this board" +
+              (" within the depth limit" if args.depth_limit is not None else ""),
+              file=sys.stderr)
+        sys.exit(EXIT_UNSOLVABLE)
+    solution = get_solution(initial_state, final_goal_state)
+    # print("elapsed time: ", time2-time1)
+    # print("number of moves: ", final_goal_state.depth)
+    if args.shorten is not None:
+        keys = shorten_path([state.key for state in solution], args.shorten)
+        solution = get_solution(initial_state, path_to_goal_state(keys))
+        time3 = time.time()
+        print("shortened the solution from {} to {} moves in {:.2f}s".format(
+            final_goal_state.depth, len(solution) - 1, time3 - time2),
+            file=sys.stderr)
+    write_solution(solution, args.outputfile, args.format)
+    if args.stats is not None:
+        report = {'algo': args.algo, 'moves': len(solution) - 1,
+                  'cached': cache is not None and cache.hits > 0,
+                  'seconds': round(time2 - time1, 4)}
+        if args.shorten is not None:
+            report['unshortened_moves'] = final_goal_state.depth
+            report['shorten_seconds'] = round(time3 - time2, 4)
+        report.update(stats.as_dict())
+        if args.stats == '-':
+            print(json.dumps(report, indent=1))
+        else:
+            with open(args.stats, "w") as out:
+                json.dump(report, out, indent=1)
+
+def build_db_command(argv):
+    '''Build the goal distance database for the pieces of an input file.'''
+    parser = argparse.ArgumentParser(prog="hrd.py build-db")
+    parser.add_argument(
+        "--inputfile",
+        type=str,
+        required=True,
+        help="A puzzle with the pieces to build the database for."
+    )
+    parser.add_argument(
+        "--dbfile",
+        type=str,
+        required=True,
+        help="The database file to write."
+    )
+    parser.add_argument(
+        "--numpy",
+        action="store_true",
+        help="Use the vectorized breadth first search (needs NumPy)."
+    )
+    args = parser.parse_args(argv)
+
+    if args.numpy:
+        try:
+            get_vector_tables()
+        except ImportError as e:
+            parser.error(str(e))
+    counts = piece_counts(board_to_key(read_from_file(args.inputfile)))
+    if SPEC != CLASSIC:
+        parser.error("distance databases are only built for the classic board")
+    time1 = time.time()
+    count = build_distance_db(counts, args.dbfile, args.numpy)
+    print("{} boards written to {} in {:.1f}s".format(count, args.dbfile,
+                                                       time.time() - time1))
+
+def build_index_command(argv):
+    '''Build the component index for the pieces of an input file.'''
+    parser = argparse.ArgumentParser(prog="hrd.py build-index")
+    parser.add_argument(
+        "--inputfile",
+        type=str,
+        required=True,
+        help="A puzzle with the pieces to build the index for."
+    )
+    parser.add_argument(
+        "--indexfile",
+        type=str,
+        required=True,
+        help="The index file to write."
+    )
+    args = parser.parse_args(argv)
+
+    counts = piece_counts(board_to_key(read_from_file(args.inputfile)))
+    if SPEC != CLASSIC:
+        parser.error("component indexes are only built for the classic board")
+    time1 = time.time()
+    count, components = build_component_index(counts, args.indexfile)
+    print("{} boards in {} components written to {} in {:.1f}s".format(
+        count, components, args.indexfile, time.time() - time1))
+
+def heuristics_command(argv):
+    '''Print the number of states astar expands with each heuristic.'''
+    parser = argparse.ArgumentParser(prog="hrd.py heuristics")
+    parser.add_argument(
+        "--inputfile",
+        type=str,
+        required=True,
+        help="The input file that contains the puzzle."
+    )
+    parser.add_argument(
+        "--dbfile",
+        type=str,
+        help="A goal distance database to compare as well."
+    )
+    args = parser.parse_args(argv)
+
+    board = read_from_file(args.inputfile)
+    initial_state = State(board_to_key(board), heuristic(board), 0)
+    db = DistanceDB(args.dbfile) if args.dbfile else None
+    print("{:<10} {:>6} {:>9} {:>10} {:>8}".format(
+        "heuristic", "moves", "expanded", "generated", "seconds"))
+    for row in compare_heuristics(initial_state, db):
+        print("{:<10} {:>6} {:>9} {:>10} {:>8.2f}".format(*row))
+
+def batch_command(argv):
+    '''Solve many puzzles in parallel and write the results as JSON lines.'''
+    parser = argparse.ArgumentParser(prog="hrd.py batch")
+    parser.add_argument(
+        "--input",
+        type=str,
+        required=True,
+        help="A directory of puzzle files, a glob pattern, a JSONL file or a "
+             "file of boards separated by empty lines."
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=True,
+        help="The JSONL file to write the results to."
+    )
+    parser.add_argument(
+        "--algo",
+        type=str,
+        default='astar',
+        choices=ALGORITHMS,
+        help="The searching algorithm (default: astar)."
+    )
+    parser.add_argument(
+        "--heuristic",
+        type=str,
+        choices=list(HEURISTICS),
+        help="The heuristic of astar, idastar and smastar."
+    )
+    parser.add_argument(
+        "--dbfile",
+        type=str,
+        help="A goal distance database, opened once by each worker."
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=float,
+        help="Memory budget in MB of idastar, smastar and ddbfs, per puzzle."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="The number of worker processes (default: one per CPU). With "
+             "hdastar the puzzles are solved one at a time, each by this many "
+             "hdastar workers."
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Seconds after which a puzzle is given up on (default: none)."
+    )
+    parser.add_argument(
+        "--indexfile",
+        type=str,
+        help="A component index (see build-index): puzzles that cannot reach "
+             "the goal are reported without a search."
+    )
+    parser.add_argument(
+        "--shorten",
+        type=int,
+        nargs="?",
+        const=SHORTCUT_RADIUS,
+        help="Shorten the solutions of dfs, greedy, wastar and arastar, "
+             "searching for shortcuts of up to this many moves (default: {}). "
+             "The moves before are kept as unshortened_moves.".format(SHORTCUT_RADIUS)
+    )
+    args = parser.parse_args(argv)
+
+    if args.shorten is not None and args.shorten < 0:
+        parser.error("the shortcut radius cannot be negative")
+    time1 = time.time()
+    counts = solve_batch(read_puzzles(args.input), args.output, args.algo,
+                         args.heuristic, args.dbfile, args.memory_limit,
+                         args.timeout, args.workers, args.indexfile,
+                         args.shorten)
+    print("{} puzzles in {:.1f}s: {}".format(
+        sum(counts.values()), time.time() - time1,
+        ", ".join("{} {}".format(n, status) for status, n in sorted(counts.items()))))
+
+def bench_command(argv):
+    '''Run the algorithms on the benchmark puzzles and compare the results
+    with a baseline. Exit with status 1 if anything got worse.'''
+    parser = argparse.ArgumentParser(prog="hrd.py bench")
+    parser.add_argument(
+        "--corpus",
+        type=str,
+        default=BENCH_CORPUS,
+        help="The puzzles, like --input of batch (default: bench/puzzles)."
+    )
+    parser.add_argument(
+        "--algos",
+        type=str,
+        default=','.join(BENCH_ALGORITHMS),
+        help="The algorithms to run, separated by commas (default: {})."
+             .format(','.join(BENCH_ALGORITHMS))
+    )
+    parser.add_argument(
+        "--dbfile",
+        type=str,
+        help="A goal distance database for lookup and the db heuristic."
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=10,
+        help="Seconds after which a run is given up on (default: 10)."
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Run each algorithm on each puzzle this many times and keep the "
+             "fastest run (default: 3)."
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="A JSON file to write the results to."
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=BENCH_BASELINE,
+        help="The results to compare with (default: bench/baseline.json)."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="How much a count or the peak memory may grow over the baseline "
+             "before it counts as a regression (default: 0.25, that is 25%%)."
+    )
+    parser.add_argument(
+        "--time-threshold",
+        type=float,
+        default=1.0,
+        help="How much the time may grow over the baseline before it counts "
+             "as a regression (default: 1.0, twice as slow)."
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write the results to the baseline file instead of comparing, "
+             "replacing the runs of the same algorithms on the same puzzles."
+    )
+    args = parser.parse_args(argv)
+
+    algos = args.algos.split(',')
+    for algo in algos:
+        if algo not in ALGORITHMS:
+            parser.error("unknown algorithm {!r}".format(algo))
+    puzzles = [(os.path.splitext(os.path.basename(puzzle_id))[0], text)
+               for puzzle_id, text in read_puzzles(args.corpus)]
+    if not puzzles:
+        parser.error("no puzzles in {}".format(args.corpus))
+
+    results = []
+    print("{:<24} {:<8} {:<11} {:>5} {:>9} {:>9} {:>9} {:>8} {:>8}".format(
+        'puzzle', 'algo', 'status', 'moves', 'expanded', 'generated',
+        'frontier', 'rss KB', 'seconds'))
+    for result in run_bench(puzzles, algos, args.dbfile, args.timeout,
+                            args.repeat):
+        results.append(result)
+        print("{:<24} {:<8} {:<11} {:>5} {:>9} {:>9} {:>9} {:>8} {:>8}".format(
+            result['id'], result['algo'], result['status'],
+            *(result.get(field, '-') for field in
+              ('moves', 'expanded', 'generated', 'max_frontier', 'max_rss_kb',
+               'seconds'))))
+        sys.stdout.flush()
+    report = {'python': sys.version.split()[0], 'results': results}
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(report, out, indent=1)
+    if args.update_baseline:
+        if os.path.exists(args.baseline): # keep the runs not done this time
+            with open(args.baseline) as baseline_file:
+                old = json.load(baseline_file)['results']
+            done = {(result['id'], result['algo']) for result in results}
+            report['results'] = [result for result in old if
+                                 (result['id'], result['algo']) not in done] + results
+        with open(args.baseline, "w") as out:
+            json.dump(report, out, indent=1)
+        print("baseline written to {}".format(args.baseline))
+        return
+    if not os.path.exists(args.baseline):
+        print("no baseline at {}".format(args.baseline))
+        return
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+    regressions, missing = compare_bench(results, baseline, args.threshold,
+                                         args.time_threshold)
+    for regression in regressions:
+        print("REGRESSION " + regression)
+    for name in missing:
+        print("NOT IN BASELINE " + name)
+    if regressions or missing:
+        sys.exit(1)
+    print("no regressions against {}".format(args.baseline))
+
+def speedup_command(argv):
+    '''Print the time hdastar takes with 1 up to --max-workers workers.'''
+    parser = argparse.ArgumentParser(prog="hrd.py speedup")
+    parser.add_argument(
+        "--inputfile",
+        type=str,
+        required=True,
+        help="The input file that contains the puzzle."
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=os.cpu_count(),
+        help="The most workers to try (default: one per CPU)."
+    )
+    parser.add_argument(
+        "--heuristic",
+        type=str,
+        default='manhattan',
+        choices=list(HEURISTICS),
+        help="The heuristic (default: manhattan)."
+    )
+    parser.add_argument(
+        "--dbfile",
+        type=str,
+        help="The distance database of the db heuristic."
+    )
+    args = parser.parse_args(argv)
+
+    key = board_to_key(read_from_file(args.inputfile))
+    initial_state = State(key, heuristic_key(key), 0)
+    db = DistanceDB(args.dbfile) if args.dbfile else None
+    print("{:>7} {:>6} {:>9} {:>8} {:>7}".format(
+        "workers", "moves", "expanded", "seconds", "speedup"))
+    base = None
+    for workers in range(1, args.max_workers + 1):
+        stats = SearchStats()
+        time1 = time.time()
+        goal_state = hdastar(initial_state, workers, args.heuristic, db, stats)
+        seconds = time.time() - time1
+        base = base or seconds
+        print("{:>7} {:>6} {:>9} {:>8.2f} {:>7.2f}".format(
+            workers, goal_state.depth if goal_state else '-', stats.expanded,
+            seconds, base / seconds))
+
+def replay_command(argv):
+    '''Make the moves of a solution file and write the boards on the way.'''
+    parser = argparse.ArgumentParser(prog="hrd.py replay")
+    parser.add_argument(
+        "--inputfile",
+        type=str,
+        required=True,
+        help="A solution file in any of the formats of --format."
+    )
+    parser.add_argument(
+        "--outputfile",
+        type=str,
+        required=True,
+        help="The file to write the solution to."
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=FORMATS,
+        default='boards',
+        help="How to write the solution (default: boards)."
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        keys = read_solution(args.inputfile)
+    except (ValueError, KeyError) as e:
+        parser.error("{}: {}".format(args.inputfile, e))
+    write_solution([State(key, 0, depth) for depth, key in enumerate(keys)],
+                   args.outputfile, args.format)
+
+def serve_command(argv):
+    '''Run the solver service (see SolverService) until interrupted.'''
+    parser = argparse.ArgumentParser(prog="hrd.py serve")
+    parser.add_argument(
+        "--socket",
+        type=str,
+        help="Listen on this Unix socket instead of TCP."
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default=SERVE_HOST,
+        help="The address to listen on (default: {}).".format(SERVE_HOST)
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=SERVE_PORT,
+        help="The TCP port to listen on (default: {}).".format(SERVE_PORT)
+    )
+    parser.add_argument(
+        "--algo",
+        type=str,
+        default='astar',
+        choices=ALGORITHMS,
+        help="The algorithm of requests that do not ask for one "
+             "(default: astar)."
+    )
+    parser.add_argument(
+        "--heuristic",
+        type=str,
+        choices=list(HEURISTICS),
+        help="The heuristic of the searches (default: db with --dbfile, "
+             "manhattan otherwise)."
+    )
+    parser.add_argument(
+        "--dbfile",
+        type=str,
+        help="A goal distance database, needed by lookup."
+    )
+    parser.add_argument(
+        "--indexfile",
+        type=str,
+        help="A component index (see build-index): boards that cannot reach "
+             "the goal are answered without a search."
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=float,
+        help="Memory budget in MB of idastar, smastar and ddbfs, per request."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="The number of worker processes (default: one per CPU)."
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Seconds after which a request is given up on, unless it asks "
+             "for another timeout (default: none)."
+    )
+    parser.add_argument(
+        "--cachefile",
+        type=str,
+        help="A solution cache (an SQLite file, made if missing) kept across "
+             "runs of the service (default: solutions are only cached in "
+             "memory, for as long as the service runs)."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write --cachefile, only cache in memory."
+    )
+    args = parser.parse_args(argv)
+
+    import asyncio
+    service = SolverService(args.algo, args.heuristic, args.dbfile, args.indexfile,
+                            args.memory_limit, args.timeout, args.workers,
+                            None if args.no_cache else args.cachefile)
+    print("serving on {}".format(args.socket or 'http://{}:{}'.format(
+        args.host, args.port)), file=sys.stderr)
+    try:
+        asyncio.run(serve(service, args.socket, args.host, args.port))
+    finally:
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+# Commands other than solving, run as: python3 hrd.py <command> [options]
+COMMANDS = {
+    'build-db': build_db_command,
+    'build-index': build_index_command,
+    'heuristics': heuristics_command,
+    'batch': batch_command,
+    'speedup': speedup_command,
+    'replay': replay_command,
+    'bench': bench_command,
+    'serve': serve_command,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+    else:
+        solve_command(sys.argv[1:])
+
+##################### DFS TESTING #####################
+    # time1 = time.time()
+    # print("STARTING DFS: ")
+    # goaal = dfs(initial_state)
+    # time2 = time.time()
+    # print("dfs solution: ")
+    # goaal.board.display()
+    # print()
+    # print("elapsed time: ", time2-time1)
+    # # print("solution path: ")
+    # # for step in get_solution(initial_state, goaal):
+    # #     step.board.display()
+    #     # print()
+
+    # print("heuristic: ", heuristic(goaal.board))
+
+##################### A* TESTING #####################
+    # time1 = time.time()
+    # print("STARTING A*: ")
+    # goaal = astar(initial_state)
+    # time2 = time.time()
+    # print("a* solution: ")
+    # goaal.board.display()
+    # print()
+    # print("elapsed time: ", time2-time1)
+    # # print("solution path: ")
+    # # for step in get_solution(initial_state, goaal):
+    # #     step.board.display()
+    # #     print()
+    
+    # print("heuristic: ", heuristic(goaal.board))
+
+
+
+
+